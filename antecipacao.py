@@ -0,0 +1,72 @@
+import os
+import threading
+
+from cache_relatorios import buscar_relatorio, chave_relatorio, salvar_relatorio
+from relatorio_pdf import VERSAO_PDF, coletar_dados_pdf, gerar_pdf_completo
+
+# Preparo especulativo do relatório do médico selecionado, antes do clique no botão:
+# "pdf" consulta e monta o PDF, "dados" só faz as consultas, "0" desativa
+PREFETCH_RELATORIO = os.getenv("PREFETCH_RELATORIO", "pdf").lower()
+PREFETCH_WORKERS = 2
+
+
+class Antecipacao:
+    """Preparo em segundo plano do relatório PDF de um médico.
+
+    ``cancelar()`` descarta a tarefa se ela ainda estiver na fila; se já estiver
+    rodando, ela para na próxima etapa (entre as consultas e a montagem do PDF).
+    """
+
+    def __init__(self, executor, medico, hoje, modo=PREFETCH_RELATORIO):
+        self.medico = medico
+        self.hoje = hoje
+        self._cancelada = threading.Event()
+        self._future = executor.submit(self._executar, modo)
+
+    def _executar(self, modo):
+        if self._cancelada.is_set():
+            return None
+        chave = chave_relatorio("pdf", self.medico, self.hoje, VERSAO_PDF)
+        pdf = buscar_relatorio(chave, "pdf")
+        if pdf is not None:
+            return {"chave": chave, "pdf": pdf, "dados": None, "do_cache": True}
+        dados = coletar_dados_pdf(self.medico, self.hoje)
+        if self._cancelada.is_set():
+            return None
+        if modo != "pdf":
+            return {"chave": chave, "pdf": None, "dados": dados, "do_cache": False}
+        pdf = gerar_pdf_completo(self.medico, dados)
+        salvar_relatorio(chave, "pdf", pdf)
+        return {"chave": chave, "pdf": pdf, "dados": dados, "do_cache": False}
+
+    def cancelar(self):
+        self._cancelada.set()
+        self._future.cancel()
+
+    def resultado(self):
+        """Espera o preparo terminar; None se foi cancelado ou falhou (quem chamou refaz)."""
+        try:
+            return self._future.result()
+        except Exception:
+            return None
+
+
+def resultado_antecipado(antecipacao, medico, hoje):
+    """(pdf, dados, veio_do_cache) preparado em segundo plano para ``medico`` e ``hoje``.
+
+    Retorna None se não houve preparo para esse médico/dia, se ele foi cancelado ou
+    se o banco mudou desde então (a chave do cache de relatórios não bate mais).
+    """
+    if antecipacao is None:
+        return None
+    if antecipacao.medico != medico or antecipacao.hoje != hoje:
+        antecipacao.cancelar()
+        return None
+    pronto = antecipacao.resultado()
+    if pronto is None or pronto["chave"] != chave_relatorio("pdf", medico, hoje, VERSAO_PDF):
+        return None
+    pdf = pronto["pdf"]
+    if pdf is None:
+        pdf = gerar_pdf_completo(medico, pronto["dados"])
+        salvar_relatorio(pronto["chave"], "pdf", pdf)
+    return pdf, pronto["dados"], pronto["do_cache"]
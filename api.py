@@ -0,0 +1,137 @@
+"""API HTTP do motor de perguntas (motor.py): JSON na entrada e na saída.
+
+Atende outros clientes além do app e permite rodar vários processos atrás de um
+balanceador; o app passa a usá-la quando MOTOR_URL está definida.
+
+    POST /perguntas   {"pergunta": "...", "historico": [{"role": "user", "content": "..."}], "stream": false}
+    GET  /saude
+    GET  /latencia    p50/p95 por etapa neste processo
+
+A resposta traz sql, colunas, linhas, truncado, resposta, origem e etapas. Com
+"stream": true ela é NDJSON: um evento de motor.eventos() por linha (a resposta do
+modelo chega em pedaços, "token"), e por último {"tipo": "etapas"}; um erro no meio
+vira {"tipo": "erro", "erro": "timeout" | "bloqueada" | "falha", "mensagem"}.
+
+Uso:
+    python api.py --porta 8000 --workers 4
+    uvicorn api:app --port 8000 --workers 4
+"""
+import argparse
+import json
+import os
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+import uvicorn
+from dotenv import load_dotenv
+from openai import OpenAI
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# Antes dos módulos do projeto, que leem as variáveis de ambiente ao serem importados
+load_dotenv()
+
+import motor
+from database import get_schema_version, init_db
+from latencia import Rastreio, percentis
+
+# Perguntas atendidas ao mesmo tempo por processo (threads para o SQLite e o cliente OpenAI)
+MOTOR_THREADS = int(os.getenv("MOTOR_THREADS", "40"))
+
+_STATUS_ERRO = {"timeout": 504, "bloqueada": 422, "falha": 500}
+
+_cliente = None
+
+
+def _responder(pergunta, historico):
+    rastreio = Rastreio()
+    try:
+        resultado = motor.responder(_cliente, pergunta, historico, rastreio)
+    except Exception as e:
+        rastreio.finalizar(f"{type(e).__name__}: {e}")
+        raise
+    return dict(motor.evento_json(resultado), etapas=rastreio.finalizar())
+
+
+def _linhas_ndjson(pergunta, historico):
+    """Eventos do motor em NDJSON (gerador síncrono: o Starlette o consome numa thread)."""
+    rastreio = Rastreio()
+    try:
+        for evento in motor.eventos(_cliente, pergunta, historico, stream=True, rastreio=rastreio):
+            yield json.dumps(motor.evento_json(evento), ensure_ascii=False) + "\n"
+    except Exception as e:
+        rastreio.finalizar(f"{type(e).__name__}: {e}")
+        yield json.dumps(motor.erro_json(e), ensure_ascii=False) + "\n"
+        return
+    yield json.dumps({"tipo": "etapas", "etapas": rastreio.finalizar()}, ensure_ascii=False) + "\n"
+
+
+def _pedido_invalido(mensagem):
+    return JSONResponse({"tipo": "erro", "erro": "pedido", "mensagem": mensagem}, status_code=400)
+
+
+async def perguntas(request):
+    try:
+        corpo = await request.json()
+    except ValueError:
+        return _pedido_invalido("corpo não é JSON")
+    if not isinstance(corpo, dict):
+        return _pedido_invalido("esperado um objeto JSON")
+    pergunta = corpo.get("pergunta")
+    if not isinstance(pergunta, str) or not pergunta.strip():
+        return _pedido_invalido('campo "pergunta" ausente ou vazio')
+    historico = [
+        m for m in corpo.get("historico") or []
+        if isinstance(m, dict) and m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+    ]
+
+    if corpo.get("stream"):
+        return StreamingResponse(_linhas_ndjson(pergunta.strip(), historico), media_type="application/x-ndjson")
+    try:
+        return JSONResponse(await run_in_threadpool(_responder, pergunta.strip(), historico))
+    except Exception as e:
+        erro = motor.erro_json(e)
+        return JSONResponse(erro, status_code=_STATUS_ERRO[erro["erro"]])
+
+
+async def saude(request):
+    return JSONResponse({"status": "ok", "schema_version": await run_in_threadpool(get_schema_version)})
+
+
+async def latencia(request):
+    return JSONResponse(percentis())
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    """Executado uma vez por processo: migra o banco e cria o cliente OpenAI."""
+    global _cliente
+    await run_in_threadpool(init_db)
+    _cliente = OpenAI()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = MOTOR_THREADS
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/perguntas", perguntas, methods=["POST"]),
+        Route("/saude", saude),
+        Route("/latencia", latencia),
+    ],
+    lifespan=_ciclo_de_vida,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP do motor de perguntas.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="processos atendendo a mesma porta")
+    args = parser.parse_args()
+    uvicorn.run("api:app", host=args.host, port=args.porta, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Benchmarks das consultas (database.py) e dos relatórios (app.py) em bancos sintéticos.
+
+Uso:
+    python benchmark.py --escalas 0.1 0.5 1 --repeticoes 10 --saida bench.json
+    python benchmark.py --escalas 0.1 --comparar bench.json   # falha se algo ficou mais lento
+
+Para cada escala o banco é criado pelo gerador.py (e reaproveitado no mesmo dia, em
+--dir-bancos). Cada medição roda com o cache de resultados limpo, então mede o trabalho
+real e não um acerto de cache. Os tempos (p50/p95) vêm de execuções sem tracemalloc; o
+pico de memória vem de uma execução extra com tracemalloc (alocações Python, incluindo
+pandas/numpy). O app.py é importado fora do ``streamlit run`` com um cliente OpenAI
+falso, então nenhuma chamada de API é feita.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import database
+import gerador
+import relatorio_pdf
+
+# Perguntas típicas que o modelo transforma em SQL (execute_query)
+CONSULTAS_SQL = {
+    "contagem": "SELECT COUNT(*) AS total FROM consultas",
+    "por_especialidade": """
+        SELECT m.especialidade, COUNT(*) AS consultas
+        FROM consultas c JOIN medicos m ON c.medico_id = m.id
+        GROUP BY m.especialidade ORDER BY consultas DESC
+    """,
+    "faturamento_mensal": """
+        SELECT strftime('%Y-%m', data_emissao) AS mes, SUM(valor_pago) AS receita
+        FROM contas GROUP BY mes ORDER BY mes
+    """,
+    "top_pacientes": """
+        SELECT p.nome, COUNT(*) AS consultas
+        FROM consultas c JOIN pacientes p ON c.paciente_id = p.id
+        GROUP BY p.id ORDER BY consultas DESC LIMIT 10
+    """,
+}
+
+# Consultas parametrizadas (execute_query_raw), no formato usado pelos relatórios
+CONSULTAS_RAW = {
+    "consultas_do_dia": (
+        "SELECT c.hora_consulta, c.status, c.medico_id FROM consultas c WHERE c.data_consulta = ?",
+        lambda: (date.today().isoformat(),),
+    ),
+    "contas_pendentes": (
+        "SELECT COUNT(*) AS n, SUM(valor_total - valor_pago) AS aberto FROM contas WHERE status IN (?, ?)",
+        lambda: ("pendente", "parcial"),
+    ),
+}
+
+
+class _CompletionsFalso:
+    def create(self, model, messages, stream=False, **kwargs):
+        mensagem = types.SimpleNamespace(content="SELECT 1", role="assistant")
+        escolha = types.SimpleNamespace(message=mensagem, delta=mensagem, finish_reason="stop")
+        resposta = types.SimpleNamespace(choices=[escolha])
+        return iter([resposta]) if stream else resposta
+
+
+class OpenAIFalso:
+    """Substituto do cliente OpenAI: responde na hora, sem rede."""
+
+    def __init__(self, *args, **kwargs):
+        self.chat = types.SimpleNamespace(completions=_CompletionsFalso())
+
+
+def _importar_app():
+    """Importa app.py em modo "bare" (sem servidor Streamlit) com o cliente OpenAI falso."""
+    import openai
+    import streamlit.config
+    import streamlit.logger
+
+    openai.OpenAI = OpenAIFalso
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Sem servidor, cada chamada st.* avisa que falta o ScriptRunContext
+    streamlit.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+    import app
+
+    return app
+
+
+def _banco(escala, anos, seed, dir_bancos, processos):
+    """Banco sintético da escala; reaproveitado se já foi gerado hoje com os mesmos parâmetros."""
+    os.makedirs(dir_bancos, exist_ok=True)
+    caminho = os.path.join(dir_bancos, f"bench_e{escala:g}_a{anos:g}_s{seed}_{date.today().isoformat()}.db")
+    if not os.path.exists(caminho):
+        print(f"gerando {caminho}...", file=sys.stderr)
+        gerador.gerar(caminho, escala, anos, seed, processos, log=lambda msg: None)
+    return caminho
+
+
+def _contagens(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                for t in ("pacientes", "medicos", "consultas", "contas", "pagamentos")}
+    finally:
+        conn.close()
+
+
+def _medir(funcao, repeticoes, aquecimento=1):
+    """Tempos (ms) de ``repeticoes`` execuções e pico de memória (KB) de uma execução extra."""
+    for _ in range(aquecimento):
+        database.clear_result_cache()
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        database.clear_result_cache()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    database.clear_result_cache()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tempos = np.array(tempos)
+    return {
+        "n": repeticoes,
+        "p50_ms": round(float(np.percentile(tempos, 50)), 3),
+        "p95_ms": round(float(np.percentile(tempos, 95)), 3),
+        "media_ms": round(float(tempos.mean()), 3),
+        "min_ms": round(float(tempos.min()), 3),
+        "max_ms": round(float(tempos.max()), 3),
+        "pico_memoria_kb": round(pico / 1024, 1),
+    }
+
+
+def _casos(app):
+    """Nome -> função sem argumentos a medir, para o banco atualmente em database.DB_PATH."""
+    # Médico com mais consultas hoje, para que agenda e PDF tenham conteúdo
+    medico = database.execute_query_raw("""
+        SELECT m.nome FROM consultas c JOIN medicos m ON c.medico_id = m.id
+        WHERE c.data_consulta = ? GROUP BY m.id ORDER BY COUNT(*) DESC, m.id LIMIT 1
+    """, (date.today().isoformat(),), use_cache=False)
+    medico = medico["nome"].iloc[0] if not medico.empty else app._nomes_medicos()[0]
+    dados_dashboard = app._gerar_dashboard_financeiro()
+
+    casos = {}
+    for nome, sql in CONSULTAS_SQL.items():
+        casos[f"execute_query[{nome}]"] = lambda sql=sql: database.execute_query(sql)
+    for nome, (sql, params) in CONSULTAS_RAW.items():
+        casos[f"execute_query_raw[{nome}]"] = lambda sql=sql, params=params: database.execute_query_raw(sql, params())
+    casos["_gerar_agenda_hoje"] = lambda: app._gerar_agenda_hoje(medico)
+    casos["_gerar_resumo_ontem"] = lambda: app._gerar_resumo_ontem(medico)
+    casos["_gerar_dashboard_financeiro"] = app._gerar_dashboard_financeiro
+    casos["_gerar_html_dashboard"] = lambda: app._gerar_html_dashboard(dados_dashboard)
+    casos["_gerar_html_dashboard[svg]"] = lambda: app._gerar_html_dashboard(dados_dashboard, "svg")
+    casos["gerar_pdf_completo"] = lambda: relatorio_pdf.gerar_pdf_completo(medico)
+    return casos
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(escalas, anos=0.5, repeticoes=10, seed=42, dir_bancos="bench_bancos", processos=1, filtro=None):
+    """Roda os benchmarks e retorna o documento de resultados (serializável em JSON)."""
+    caminho_original = database.DB_PATH
+    database.DB_PATH = _banco(escalas[0], anos, seed, dir_bancos, processos)
+    app = _importar_app()
+
+    resultados = []
+    try:
+        for escala in escalas:
+            caminho = _banco(escala, anos, seed, dir_bancos, processos)
+            database.DB_PATH = caminho
+            database.init_db()
+            contagens = _contagens(caminho)
+            for nome, funcao in _casos(app).items():
+                if filtro and filtro not in nome:
+                    continue
+                medicao = _medir(funcao, repeticoes)
+                resultados.append({"escala": escala, "benchmark": nome, "linhas": contagens, **medicao})
+                print(f"escala {escala:g} ({contagens['consultas']:,} consultas) {nome}: "
+                      f"p50 {medicao['p50_ms']:.1f} ms, p95 {medicao['p95_ms']:.1f} ms, "
+                      f"pico {medicao['pico_memoria_kb']:,.0f} KB", file=sys.stderr)
+    finally:
+        database.close_pool()
+        database.DB_PATH = caminho_original
+
+    return {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "anos": anos,
+            "seed": seed,
+            "repeticoes": repeticoes,
+            "rss_max_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(atual, anterior, tolerancia, folga_ms=1.0):
+    """Benchmarks cujo p50 piorou mais que ``tolerancia`` (fração) e mais que ``folga_ms``
+    em relação a ``anterior`` — a folga evita alarmes por ruído em medições de 1-2 ms."""
+    base = {(r["escala"], r["benchmark"]): r for r in anterior["resultados"]}
+    regressoes = []
+    for r in atual["resultados"]:
+        ref = base.get((r["escala"], r["benchmark"]))
+        if (ref and ref["p50_ms"] > 0 and r["p50_ms"] > ref["p50_ms"] * (1 + tolerancia)
+                and r["p50_ms"] - ref["p50_ms"] > folga_ms):
+            regressoes.append({
+                "escala": r["escala"],
+                "benchmark": r["benchmark"],
+                "p50_anterior_ms": ref["p50_ms"],
+                "p50_atual_ms": r["p50_ms"],
+                "variacao": round(r["p50_ms"] / ref["p50_ms"] - 1, 3),
+            })
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de consultas e relatórios em bancos sintéticos.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[0.1, 0.5, 1.0],
+                        help="fatores de escala do gerador.py")
+    parser.add_argument("--anos", type=float, default=0.5, help="anos de histórico de cada banco")
+    parser.add_argument("--repeticoes", type=int, default=10, help="execuções medidas por benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dir-bancos", default="bench_bancos", help="onde guardar os bancos gerados")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos do gerador")
+    parser.add_argument("--filtro", help="só benchmarks cujo nome contém este texto")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora aceita no p50 (0.2 = 20%%)")
+    parser.add_argument("--folga-ms", type=float, default=1.0, help="piora absoluta no p50 ignorada, em ms")
+    args = parser.parse_args()
+
+    if args.repeticoes < 1:
+        parser.error("--repeticoes deve ser >= 1")
+
+    doc = executar(args.escalas, args.anos, args.repeticoes, args.seed, args.dir_bancos,
+                   args.processos, args.filtro)
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(doc, json.load(f), args.tolerancia, args.folga_ms)
+        doc["regressoes"] = regressoes
+
+    texto = json.dumps(doc, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    for r in regressoes:
+        print(f"REGRESSÃO escala {r['escala']:g} {r['benchmark']}: "
+              f"{r['p50_anterior_ms']:.1f} -> {r['p50_atual_ms']:.1f} ms ({r['variacao']:+.0%})", file=sys.stderr)
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Cache persistente de SQL gerado pelo modelo, em um arquivo separado do banco hospitalar
+CACHE_DB_PATH = os.getenv("SQL_CACHE_PATH", "cache.db")
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "2000"))
+SQL_CACHE_TTL = int(os.getenv("SQL_CACHE_TTL", str(7 * 24 * 3600)))  # segundos
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _conexao():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                chave TEXT PRIMARY KEY,
+                pergunta TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                usado_em REAL NOT NULL,
+                acertos INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_usado_em ON sql_cache (usado_em)")
+        _conn.commit()
+    return _conn
+
+
+def normalizar_pergunta(pergunta):
+    """Minúsculas, sem acentos, sem pontuação e com espaços colapsados."""
+    texto = unicodedata.normalize("NFKD", pergunta.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+
+def chave_sql(pergunta, contexto, schema):
+    """Chave do cache: pergunta normalizada + impressão digital do histórico + hash do esquema."""
+    partes = [
+        normalizar_pergunta(pergunta),
+        hashlib.sha256(contexto.encode()).hexdigest(),
+        hashlib.sha256(schema.encode()).hexdigest(),
+    ]
+    return hashlib.sha256("\x1f".join(partes).encode()).hexdigest()
+
+
+def buscar_sql(pergunta, contexto, schema):
+    """Retorna o SQL em cache para a pergunta, ou None se não houver entrada válida."""
+    chave = chave_sql(pergunta, contexto, schema)
+    agora = time.time()
+    with _lock:
+        conn = _conexao()
+        row = conn.execute(
+            "SELECT sql FROM sql_cache WHERE chave = ? AND criado_em >= ?",
+            (chave, agora - SQL_CACHE_TTL),
+        ).fetchone()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        conn.execute(
+            "UPDATE sql_cache SET usado_em = ?, acertos = acertos + 1 WHERE chave = ?",
+            (agora, chave),
+        )
+        conn.commit()
+        _stats["hits"] += 1
+        return row[0]
+
+
+def salvar_sql(pergunta, contexto, schema, sql):
+    """Grava o SQL gerado e aplica a expiração (TTL) e o limite de entradas (LRU)."""
+    chave = chave_sql(pergunta, contexto, schema)
+    agora = time.time()
+    with _lock:
+        conn = _conexao()
+        conn.execute(
+            "INSERT OR REPLACE INTO sql_cache (chave, pergunta, sql, criado_em, usado_em) VALUES (?, ?, ?, ?, ?)",
+            (chave, pergunta, sql, agora, agora),
+        )
+        conn.execute("DELETE FROM sql_cache WHERE criado_em < ?", (agora - SQL_CACHE_TTL,))
+        conn.execute("""
+            DELETE FROM sql_cache WHERE chave IN (
+                SELECT chave FROM sql_cache ORDER BY usado_em DESC LIMIT -1 OFFSET ?
+            )
+        """, (SQL_CACHE_MAX_ENTRIES,))
+        conn.commit()
+
+
+def limpar_cache_sql():
+    """Remove todas as entradas do cache de SQL e zera os contadores. Retorna quantas foram removidas."""
+    with _lock:
+        conn = _conexao()
+        removidas = conn.execute("DELETE FROM sql_cache").rowcount
+        conn.commit()
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+        return removidas
+
+
+def estatisticas_cache_sql():
+    """Contadores de acerto/erro do processo e tamanho atual do cache."""
+    with _lock:
+        entradas = _conexao().execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "entradas": entradas,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "taxa_acerto": _stats["hits"] / total if total else 0.0,
+        }
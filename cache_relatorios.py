@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import database
+
+# Cache em disco de relatórios já renderizados (PDF e dashboard HTML), compartilhado
+# entre sessões e processos. A chave inclui a versão dos dados, então qualquer escrita
+# no banco invalida as entradas antigas, que saem pela política de tamanho.
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", ".cache_relatorios")
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MB", "200")) * 1024 * 1024
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def chave_relatorio(tipo, medico, dia, versao_template):
+    """Chave de um relatório: tipo, médico, data de referência, versão dos dados e do layout."""
+    partes = [tipo, medico or "", str(dia), os.path.abspath(database.DB_PATH),
+              database.get_data_version(), str(versao_template)]
+    return hashlib.sha256("\x1f".join(partes).encode()).hexdigest()
+
+
+def _caminho(chave, extensao):
+    return os.path.join(REPORT_CACHE_DIR, f"{chave}.{extensao}")
+
+
+def _arquivos():
+    """Relatórios gravados (ignora os temporários de escritas em andamento)."""
+    if not os.path.isdir(REPORT_CACHE_DIR):
+        return []
+    return [os.path.join(REPORT_CACHE_DIR, n) for n in os.listdir(REPORT_CACHE_DIR) if not n.endswith(".tmp")]
+
+
+def buscar_relatorio(chave, extensao):
+    """Conteúdo (bytes) do relatório em cache, ou None."""
+    caminho = _caminho(chave, extensao)
+    try:
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+    except FileNotFoundError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    # mtime marca o último uso, para a remoção dos menos usados
+    try:
+        os.utime(caminho)
+    except FileNotFoundError:
+        pass
+    with _lock:
+        _stats["hits"] += 1
+    return conteudo
+
+
+def _aplicar_limite():
+    entradas = []
+    for caminho in _arquivos():
+        try:
+            st = os.stat(caminho)
+        except FileNotFoundError:
+            continue
+        entradas.append((st.st_mtime_ns, st.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= REPORT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+
+
+def salvar_relatorio(chave, extensao, conteudo):
+    """Grava o relatório (escrita atômica) e remove os menos usados acima do limite."""
+    if len(conteudo) > REPORT_CACHE_MAX_BYTES:
+        return
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=REPORT_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, _caminho(chave, extensao))
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    with _lock:
+        _aplicar_limite()
+
+
+def obter_relatorio(tipo, medico, dia, versao_template, extensao, gerar):
+    """Retorna (conteúdo, veio_do_cache); em caso de miss chama ``gerar()`` (bytes) e grava."""
+    chave = chave_relatorio(tipo, medico, dia, versao_template)
+    conteudo = buscar_relatorio(chave, extensao)
+    if conteudo is not None:
+        return conteudo, True
+    conteudo = gerar()
+    salvar_relatorio(chave, extensao, conteudo)
+    return conteudo, False
+
+
+def limpar_cache_relatorios():
+    """Remove todos os relatórios em cache e zera os contadores. Retorna quantos foram removidos."""
+    removidos = 0
+    with _lock:
+        for caminho in _arquivos():
+            try:
+                os.remove(caminho)
+                removidos += 1
+            except FileNotFoundError:
+                pass
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+    return removidos
+
+
+def estatisticas_cache_relatorios():
+    """Arquivos e bytes em disco, mais os acertos/erros deste processo."""
+    arquivos, tamanho = 0, 0
+    for caminho in _arquivos():
+        try:
+            tamanho += os.path.getsize(caminho)
+            arquivos += 1
+        except FileNotFoundError:
+            pass
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "arquivos": arquivos,
+            "bytes": tamanho,
+            "max_bytes": REPORT_CACHE_MAX_BYTES,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "taxa_acerto": _stats["hits"] / total if total else 0.0,
+        }
@@ -1,16 +1,201 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
 import sqlite3
 import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import date, timedelta
 
 import pandas as pd
+from dotenv import load_dotenv
 
-DB_PATH = "hospital.db"
+# As configurações abaixo são lidas na importação, então o .env precisa ser carregado antes
+load_dotenv()
 
+DB_PATH = os.getenv("DB_PATH", "hospital.db")
 
-def init_db():
+# Pool de conexões somente leitura usado por execute_query, execute_query_raw e get_schema
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = 30  # segundos esperando uma conexão livre
+STATEMENT_CACHE_SIZE = 256  # statements compilados mantidos por conexão
+
+# Limites para o SQL gerado pelo modelo (execute_query); 0 desliga o limite
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "10"))  # segundos por consulta
+QUERY_MAX_STEPS = int(os.getenv("QUERY_MAX_STEPS", "0"))  # instruções da VM do SQLite
+QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "5000"))  # linhas trazidas para o DataFrame
+PROGRESS_INTERVAL = 1000  # instruções da VM entre verificações do orçamento
+
+# Log de consultas lentas: statements acima de SLOW_QUERY_MS (ou todos, com SQL_TRACE=1)
+# vão para um arquivo JSON Lines com rotação; SLOW_QUERY_LOG vazio grava só em memória
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+SQL_TRACE = os.getenv("SQL_TRACE", "0") == "1"
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("SLOW_QUERY_LOG_MB", "5")) * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+SLOW_QUERY_MEMORY = 200  # entradas recentes mantidas em memória
+
+
+class ConnectionPool:
+    """Pool thread-safe de conexões SQLite somente leitura, reaproveitadas entre chamadas.
+
+    Cada thread recebe uma conexão exclusiva enquanto a usa (chamadas aninhadas na
+    mesma thread reaproveitam a mesma conexão). As conexões ficam abertas, então o
+    cache de páginas e o cache de statements compilados (``cached_statements``)
+    continuam quentes entre consultas.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 cached_statements=STATEMENT_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.closed = False
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Nenhuma conexão livre no pool após {self.timeout}s (tamanho {self.size})"
+            ) from None
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self.closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool para a thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close(self):
+        """Fecha as conexões ociosas; as emprestadas são fechadas ao serem devolvidas."""
+        self.closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Retorna o pool do processo, recriando-o se DB_PATH mudou ou se foi fechado."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def close_pool():
+    """Fecha o pool atual (ex.: antes de substituir o arquivo do banco)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def init_db(seed=True):
+    """Aplica as migrações pendentes; se o banco já está na versão atual, é só um PRAGMA.
+
+    Com ``seed``, um banco recém-criado recebe os dados de exemplo (gerador.py cria o
+    esquema com ``seed=False`` e faz a própria carga).
+    """
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        # WAL permite que as conexões de leitura do pool convivam com escritas
+        conn.execute("PRAGMA journal_mode=WAL")
+        for target, migration in MIGRATIONS:
+            if target <= version:
+                continue
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                # Outro processo pode ter migrado enquanto esperávamos o lock de escrita
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                    continue
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {target}")
+
+        if seed:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("SELECT COUNT(*) FROM pacientes").fetchone()[0] == 0:
+                    _seed_data(conn.cursor())
+    finally:
+        conn.close()
+
 
+def _migration_1(cursor):
+    """Esquema inicial (bancos antigos já têm as tabelas)."""
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS pacientes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -90,12 +275,373 @@ def init_db():
         )
     """)
 
-    cursor.execute("SELECT COUNT(*) FROM pacientes")
-    if cursor.fetchone()[0] == 0:
-        _seed_data(cursor)
 
-    conn.commit()
-    conn.close()
+# --- Rollups diários de faturamento ---
+# rollup_contas_diario: contas por dia de emissão x médico x procedimento x convênio x status
+# (convenio_id 0 = sem convênio). n_consultas conta cada consulta uma única vez, na linha
+# da sua conta de menor id, para que a soma reproduza COUNT(DISTINCT consulta_id).
+# rollup_pagamentos_diario: pagamentos por dia de pagamento x forma de pagamento.
+# Os dois são mantidos por triggers a cada INSERT/UPDATE/DELETE.
+
+_ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS rollup_contas_diario (
+        dia TEXT NOT NULL,
+        medico_id INTEGER NOT NULL,
+        procedimento_id INTEGER NOT NULL,
+        convenio_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        n_contas INTEGER NOT NULL DEFAULT 0,
+        n_consultas INTEGER NOT NULL DEFAULT 0,
+        valor_total REAL NOT NULL DEFAULT 0,
+        valor_pago REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, medico_id, procedimento_id, convenio_id, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_pagamentos_diario (
+        dia TEXT NOT NULL,
+        forma_pagamento TEXT NOT NULL,
+        n_pagamentos INTEGER NOT NULL DEFAULT 0,
+        valor REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, forma_pagamento)
+    ) WITHOUT ROWID
+    """,
+    # Usado pelos triggers para saber se a conta é a primeira da consulta
+    "CREATE INDEX IF NOT EXISTS idx_contas_consulta ON contas (consulta_id)",
+]
+
+_UPSERT_CONTAS = """
+    ON CONFLICT (dia, medico_id, procedimento_id, convenio_id, status) DO UPDATE SET
+        n_contas = n_contas + excluded.n_contas,
+        n_consultas = n_consultas + excluded.n_consultas,
+        valor_total = valor_total + excluded.valor_total,
+        valor_pago = valor_pago + excluded.valor_pago
+"""
+
+_UPSERT_PAGAMENTOS = """
+    ON CONFLICT (dia, forma_pagamento) DO UPDATE SET
+        n_pagamentos = n_pagamentos + excluded.n_pagamentos,
+        valor = valor + excluded.valor
+"""
+
+
+def _rollup_conta(ref, sinal):
+    """INSERT que soma (sinal '+') ou subtrai (sinal '-') a conta NEW/OLD no rollup."""
+    return f"""
+        INSERT INTO rollup_contas_diario
+            (dia, medico_id, procedimento_id, convenio_id, status, n_contas, n_consultas, valor_total, valor_pago)
+        SELECT {ref}.data_emissao, c.medico_id, {ref}.procedimento_id, COALESCE({ref}.convenio_id, 0), {ref}.status,
+               {sinal}1,
+               {sinal}(NOT EXISTS (SELECT 1 FROM contas x WHERE x.consulta_id = {ref}.consulta_id AND x.id < {ref}.id)),
+               {sinal}{ref}.valor_total, {sinal}{ref}.valor_pago
+        FROM consultas c WHERE c.id = {ref}.consulta_id
+        {_UPSERT_CONTAS};
+    """
+
+
+def _rollup_primeira_seguinte(ref, sinal):
+    """UPDATE para a conta seguinte da consulta de NEW/OLD quando ``ref`` é a primeira.
+
+    Com sinal '+' a seguinte passa a contar a consulta (``ref`` saiu dela); com '-' deixa
+    de contar (``ref`` entrou antes dela).
+    """
+    return f"""
+        UPDATE rollup_contas_diario SET n_consultas = n_consultas {sinal} 1
+        WHERE NOT EXISTS (SELECT 1 FROM contas x WHERE x.consulta_id = {ref}.consulta_id AND x.id < {ref}.id)
+          AND (dia, medico_id, procedimento_id, convenio_id, status) = (
+              SELECT nx.data_emissao, c.medico_id, nx.procedimento_id, COALESCE(nx.convenio_id, 0), nx.status
+              FROM contas nx JOIN consultas c ON c.id = nx.consulta_id
+              WHERE nx.consulta_id = {ref}.consulta_id AND nx.id != {ref}.id
+              ORDER BY nx.id LIMIT 1
+          );
+    """
+
+
+def _rollup_contas_da_consulta(medico, sinal):
+    """INSERT que move todas as contas da consulta NEW para/de ``medico``."""
+    return f"""
+        INSERT INTO rollup_contas_diario
+            (dia, medico_id, procedimento_id, convenio_id, status, n_contas, n_consultas, valor_total, valor_pago)
+        SELECT co.data_emissao, {medico}, co.procedimento_id, COALESCE(co.convenio_id, 0), co.status,
+               {sinal}COUNT(*),
+               {sinal}SUM(co.id = (SELECT MIN(x.id) FROM contas x WHERE x.consulta_id = NEW.id)),
+               {sinal}SUM(co.valor_total), {sinal}SUM(co.valor_pago)
+        FROM contas co WHERE co.consulta_id = NEW.id
+        GROUP BY co.data_emissao, co.procedimento_id, COALESCE(co.convenio_id, 0), co.status
+        {_UPSERT_CONTAS};
+    """
+
+
+def _rollup_pagamento(ref, sinal):
+    return f"""
+        INSERT INTO rollup_pagamentos_diario (dia, forma_pagamento, n_pagamentos, valor)
+        SELECT {ref}.data_pagamento, {ref}.forma_pagamento, {sinal}1, {sinal}{ref}.valor WHERE true
+        {_UPSERT_PAGAMENTOS};
+    """
+
+
+ROLLUP_TRIGGERS = {
+    "trg_rollup_contas_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_contas_insert AFTER INSERT ON contas
+        BEGIN
+            {_rollup_conta("NEW", "+")}
+            -- Conta inserida com id menor que as da consulta: a antiga primeira deixa de contar
+            {_rollup_primeira_seguinte("NEW", "-")}
+        END
+    """,
+    "trg_rollup_contas_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_contas_update
+        AFTER UPDATE OF consulta_id, procedimento_id, convenio_id, valor_total, valor_pago, status, data_emissao ON contas
+        BEGIN
+            {_rollup_conta("OLD", "-")}
+            {_rollup_conta("NEW", "+")}
+        END
+    """,
+    # Conta movida de consulta: a primeira conta de cada uma das duas pode mudar
+    "trg_rollup_contas_consulta": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_contas_consulta AFTER UPDATE OF consulta_id ON contas
+        WHEN OLD.consulta_id IS NOT NEW.consulta_id
+        BEGIN
+            {_rollup_primeira_seguinte("OLD", "+")}
+            {_rollup_primeira_seguinte("NEW", "-")}
+        END
+    """,
+    "trg_rollup_contas_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_contas_delete AFTER DELETE ON contas
+        BEGIN
+            {_rollup_conta("OLD", "-")}
+            -- Se a conta removida era a que contava a consulta, a próxima conta passa a contar
+            {_rollup_primeira_seguinte("OLD", "+")}
+        END
+    """,
+    "trg_rollup_consultas_medico": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_consultas_medico AFTER UPDATE OF medico_id ON consultas
+        BEGIN
+            {_rollup_contas_da_consulta("OLD.medico_id", "-")}
+            {_rollup_contas_da_consulta("NEW.medico_id", "+")}
+        END
+    """,
+    "trg_rollup_pagamentos_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_pagamentos_insert AFTER INSERT ON pagamentos
+        BEGIN
+            {_rollup_pagamento("NEW", "+")}
+        END
+    """,
+    "trg_rollup_pagamentos_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_pagamentos_update
+        AFTER UPDATE OF valor, forma_pagamento, data_pagamento ON pagamentos
+        BEGIN
+            {_rollup_pagamento("OLD", "-")}
+            {_rollup_pagamento("NEW", "+")}
+        END
+    """,
+    "trg_rollup_pagamentos_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_pagamentos_delete AFTER DELETE ON pagamentos
+        BEGIN
+            {_rollup_pagamento("OLD", "-")}
+        END
+    """,
+}
+
+
+def create_rollup_triggers(cursor):
+    for ddl in ROLLUP_TRIGGERS.values():
+        cursor.execute(ddl)
+
+
+def drop_rollup_triggers(cursor):
+    """Remove os triggers (ex.: antes de cargas em massa, seguidas de rebuild_rollups)."""
+    for name in ROLLUP_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_rollups(cursor):
+    """Recalcula os rollups inteiros a partir de contas e pagamentos."""
+    cursor.execute("DELETE FROM rollup_contas_diario")
+    cursor.execute("""
+        INSERT INTO rollup_contas_diario
+            (dia, medico_id, procedimento_id, convenio_id, status, n_contas, n_consultas, valor_total, valor_pago)
+        SELECT co.data_emissao, c.medico_id, co.procedimento_id, COALESCE(co.convenio_id, 0), co.status,
+               COUNT(*), SUM(co.id = p.primeira), SUM(co.valor_total), SUM(co.valor_pago)
+        FROM contas co
+        JOIN consultas c ON c.id = co.consulta_id
+        JOIN (SELECT consulta_id, MIN(id) AS primeira FROM contas GROUP BY consulta_id) p
+          ON p.consulta_id = co.consulta_id
+        GROUP BY co.data_emissao, c.medico_id, co.procedimento_id, COALESCE(co.convenio_id, 0), co.status
+    """)
+    cursor.execute("DELETE FROM rollup_pagamentos_diario")
+    cursor.execute("""
+        INSERT INTO rollup_pagamentos_diario (dia, forma_pagamento, n_pagamentos, valor)
+        SELECT data_pagamento, forma_pagamento, COUNT(*), SUM(valor)
+        FROM pagamentos
+        GROUP BY data_pagamento, forma_pagamento
+    """)
+
+
+def _migration_2(cursor):
+    """Rollups diários de faturamento, com triggers e carga inicial."""
+    for ddl in _ROLLUP_DDL:
+        cursor.execute(ddl)
+    create_rollup_triggers(cursor)
+    rebuild_rollups(cursor)
+
+
+# --- Índices secundários gerenciados ---
+# Cobrem os filtros dos relatórios e das perguntas mais comuns: consultas por data e
+# médico, contas por consulta e data de emissão, pagamentos por conta e data, médicos
+# pelo nome. idx_contas_consulta vem dos rollups (migração 2). indices.py verifica os
+# planos de execução e aponta varreduras completas que estes índices não cobrem.
+MANAGED_INDEXES = {
+    "idx_consultas_data_medico": "consultas (data_consulta, medico_id, hora_consulta)",
+    "idx_consultas_medico_data": "consultas (medico_id, data_consulta)",
+    "idx_consultas_paciente": "consultas (paciente_id, data_consulta)",
+    "idx_contas_emissao": "contas (data_emissao, status)",
+    "idx_pagamentos_conta": "pagamentos (conta_id)",
+    "idx_pagamentos_data": "pagamentos (data_pagamento, forma_pagamento, valor)",
+    "idx_medicos_nome": "medicos (nome)",
+}
+
+
+def create_managed_indexes(cursor, analyze=True):
+    """Cria os índices gerenciados que faltarem e, com ``analyze``, as estatísticas de cada um."""
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for name, definition in MANAGED_INDEXES.items():
+        if name not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON {definition}")
+            if analyze:
+                cursor.execute(f"ANALYZE {name}")
+
+
+def drop_managed_indexes(cursor):
+    """Remove os índices gerenciados (ex.: antes de cargas em massa, seguidas de create_managed_indexes)."""
+    for name in MANAGED_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def missing_managed_indexes():
+    """Índices gerenciados ausentes do banco (removidos à mão, por exemplo)."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+    return [name for name in MANAGED_INDEXES if name not in existing]
+
+
+def _migration_3(cursor):
+    """Índices secundários gerenciados."""
+    create_managed_indexes(cursor)
+
+
+# --- Versão dos dados ---
+# Contador de escritas mantido por triggers, para chaves de cache que valem entre
+# processos e reinícios (get_data_version). ``origin`` é sorteado quando a tabela é
+# criada, então um banco recriado no mesmo caminho não repete versões antigas.
+DATA_TABLES = ("pacientes", "medicos", "consultas", "convenios", "procedimentos", "contas", "pagamentos")
+
+DATA_VERSION_TRIGGERS = {
+    f"trg_data_version_{table}_{op.lower()}": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{op.lower()} AFTER {op} ON {table}
+        BEGIN
+            UPDATE data_version SET version = version + 1;
+        END
+    """
+    for table in DATA_TABLES
+    for op in ("INSERT", "UPDATE", "DELETE")
+}
+
+
+def create_data_version_triggers(cursor):
+    for ddl in DATA_VERSION_TRIGGERS.values():
+        cursor.execute(ddl)
+
+
+def drop_data_version_triggers(cursor):
+    """Remove os triggers (ex.: antes de cargas em massa, seguidas de bump_data_version)."""
+    for name in DATA_VERSION_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def bump_data_version(cursor):
+    cursor.execute("UPDATE data_version SET version = version + 1")
+
+
+def _migration_4(cursor):
+    """Contador de versão dos dados, com triggers nas tabelas."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            origin TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_version (id, origin) VALUES (1, lower(hex(randomblob(8))))")
+    create_data_version_triggers(cursor)
+
+
+def _migration_5(cursor):
+    """Triggers dos rollups que acompanham a troca de consulta de uma conta."""
+    drop_rollup_triggers(cursor)
+    create_rollup_triggers(cursor)
+    rebuild_rollups(cursor)
+
+
+# Versão do esquema gravada em PRAGMA user_version; cada migração leva o banco à versão indicada
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# Catálogos comuns aos dados de exemplo e ao gerador de dados sintéticos (gerador.py)
+CONVENIOS = [
+    ("Unimed", "empresarial", 30.0),
+    ("Amil", "empresarial", 25.0),
+    ("SulAmérica", "individual", 20.0),
+    ("Bradesco Saúde", "empresarial", 28.0),
+    ("Hapvida", "individual", 15.0),
+    ("Particular", "particular", 0.0),
+]
+
+PROCEDIMENTOS = [
+    ("Consulta Cardiologia", "consulta", 350.00),
+    ("Consulta Dermatologia", "consulta", 300.00),
+    ("Consulta Ortopedia", "consulta", 320.00),
+    ("Consulta Pediatria", "consulta", 280.00),
+    ("Consulta Neurologia", "consulta", 380.00),
+    ("Consulta Ginecologia", "consulta", 300.00),
+    ("Consulta Clínica Geral", "consulta", 250.00),
+    ("Hemograma Completo", "exame", 80.00),
+    ("Raio-X", "exame", 150.00),
+    ("Ressonância Magnética", "exame", 850.00),
+    ("Eletrocardiograma", "exame", 200.00),
+    ("Ultrassonografia", "exame", 250.00),
+    ("Biópsia", "procedimento", 600.00),
+    ("Pequena Cirurgia", "cirurgia", 1500.00),
+    ("Endoscopia", "procedimento", 450.00),
+]
+
+DIAGNOSTICOS = [
+    "Hipertensão leve", "Resfriado comum", "Dermatite de contato",
+    "Fratura no punho", "Enxaqueca crônica", "Exame de rotina",
+    "Miopia leve", "Ansiedade generalizada", "Consulta de rotina",
+    "Hipotireoidismo", "Lombalgia", "Bronquite", "Gastrite",
+    "Diabetes tipo 2", "Infecção urinária", "Rinite alérgica",
+    "Tendinite", "Anemia", "Colesterol alto", "Dor torácica",
+]
+
+HORARIOS = [
+    "08:00", "08:30", "09:00", "09:30", "10:00", "10:30",
+    "11:00", "11:30", "13:00", "13:30", "14:00", "14:30",
+    "15:00", "15:30", "16:00", "16:30", "17:00",
+]
+
+FORMAS_PAGAMENTO = ["cartao_credito", "cartao_debito", "pix", "dinheiro", "convenio"]
 
 
 def _seed_data(cursor):
@@ -165,78 +711,37 @@ def _seed_data(cursor):
     )
 
     # --- Convênios (6) ---
-    convenios = [
-        ("Unimed", "empresarial", 30.0),
-        ("Amil", "empresarial", 25.0),
-        ("SulAmérica", "individual", 20.0),
-        ("Bradesco Saúde", "empresarial", 28.0),
-        ("Hapvida", "individual", 15.0),
-        ("Particular", "particular", 0.0),
-    ]
     cursor.executemany(
         "INSERT INTO convenios (nome, tipo, desconto_percentual) VALUES (?, ?, ?)",
-        convenios,
+        CONVENIOS,
     )
 
     # --- Procedimentos (15) ---
-    procedimentos = [
-        ("Consulta Cardiologia", "consulta", 350.00),
-        ("Consulta Dermatologia", "consulta", 300.00),
-        ("Consulta Ortopedia", "consulta", 320.00),
-        ("Consulta Pediatria", "consulta", 280.00),
-        ("Consulta Neurologia", "consulta", 380.00),
-        ("Consulta Ginecologia", "consulta", 300.00),
-        ("Consulta Clínica Geral", "consulta", 250.00),
-        ("Hemograma Completo", "exame", 80.00),
-        ("Raio-X", "exame", 150.00),
-        ("Ressonância Magnética", "exame", 850.00),
-        ("Eletrocardiograma", "exame", 200.00),
-        ("Ultrassonografia", "exame", 250.00),
-        ("Biópsia", "procedimento", 600.00),
-        ("Pequena Cirurgia", "cirurgia", 1500.00),
-        ("Endoscopia", "procedimento", 450.00),
-    ]
     cursor.executemany(
         "INSERT INTO procedimentos (nome, categoria, preco) VALUES (?, ?, ?)",
-        procedimentos,
+        PROCEDIMENTOS,
     )
 
     # --- Consultas (~120) espalhadas nos últimos 90 dias ---
-    diagnosticos = [
-        "Hipertensão leve", "Resfriado comum", "Dermatite de contato",
-        "Fratura no punho", "Enxaqueca crônica", "Exame de rotina",
-        "Miopia leve", "Ansiedade generalizada", "Consulta de rotina",
-        "Hipotireoidismo", "Lombalgia", "Bronquite", "Gastrite",
-        "Diabetes tipo 2", "Infecção urinária", "Rinite alérgica",
-        "Tendinite", "Anemia", "Colesterol alto", "Dor torácica",
-    ]
-    horarios = [
-        "08:00", "08:30", "09:00", "09:30", "10:00", "10:30",
-        "11:00", "11:30", "13:00", "13:30", "14:00", "14:30",
-        "15:00", "15:30", "16:00", "16:30", "17:00",
-    ]
-
-    consulta_id = 0
+    # Ids explícitos: contas e pagamentos referenciam as linhas geradas aqui sem reconsultar o banco
+    proximo_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM consultas").fetchone()[0]
+    consultas = []
 
     # Consultas para hoje e ontem: cada médico tem 3-5 consultas
     for dia in [hoje, ontem]:
         dia_str = dia.isoformat()
         for medico_id in range(1, 16):
             n_consultas = random.randint(3, 5)
-            horas_dia = random.sample(horarios, n_consultas)
+            horas_dia = random.sample(HORARIOS, n_consultas)
             horas_dia.sort()
             for hora in horas_dia:
                 paciente_id = random.randint(1, 30)
-                diag = random.choice(diagnosticos)
+                diag = random.choice(DIAGNOSTICOS)
                 if dia == hoje:
                     status = random.choice(["agendada", "agendada", "realizada"])
                 else:
                     status = "realizada"
-                cursor.execute(
-                    "INSERT INTO consultas (paciente_id, medico_id, data_consulta, hora_consulta, diagnostico, status) VALUES (?, ?, ?, ?, ?, ?)",
-                    (paciente_id, medico_id, dia_str, hora, diag, status),
-                )
-                consulta_id += 1
+                consultas.append((proximo_id + len(consultas), paciente_id, medico_id, dia_str, hora, diag, status))
 
     # Consultas nos últimos 90 dias (excluindo hoje e ontem)
     for i in range(2, 90):
@@ -247,18 +752,18 @@ def _seed_data(cursor):
         for _ in range(n_consultas):
             paciente_id = random.randint(1, 30)
             medico_id = random.randint(1, 15)
-            hora = random.choice(horarios)
-            diag = random.choice(diagnosticos)
+            hora = random.choice(HORARIOS)
+            diag = random.choice(DIAGNOSTICOS)
             status = "realizada"
-            cursor.execute(
-                "INSERT INTO consultas (paciente_id, medico_id, data_consulta, hora_consulta, diagnostico, status) VALUES (?, ?, ?, ?, ?, ?)",
-                (paciente_id, medico_id, dia_str, hora, diag, status),
-            )
-            consulta_id += 1
+            consultas.append((proximo_id + len(consultas), paciente_id, medico_id, dia_str, hora, diag, status))
 
-    # Buscar todas consultas realizadas para gerar contas
-    cursor.execute("SELECT id, medico_id, data_consulta FROM consultas WHERE status = 'realizada'")
-    consultas_realizadas = cursor.fetchall()
+    cursor.executemany(
+        "INSERT INTO consultas (id, paciente_id, medico_id, data_consulta, hora_consulta, diagnostico, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        consultas,
+    )
+
+    # Consultas realizadas geram contas, na mesma ordem de id
+    consultas_realizadas = [(c[0], c[2], c[3]) for c in consultas if c[6] == "realizada"]
 
     # Mapear médico -> procedimento de consulta mais provável
     medico_procedimento = {
@@ -266,10 +771,16 @@ def _seed_data(cursor):
         8: 7, 9: 7, 10: 7, 11: 7, 12: 7, 13: 7, 14: 7, 15: 7,
     }
 
-    # --- Contas e Pagamentos ---
-    formas_pagamento = ["cartao_credito", "cartao_debito", "pix", "dinheiro", "convenio"]
+    # Preços e descontos em memória, em vez de um SELECT por conta
+    primeiro_proc = cursor.execute("SELECT COALESCE(MIN(id), 1) FROM procedimentos").fetchone()[0]
+    preco_procedimento = {primeiro_proc + i: p[2] for i, p in enumerate(PROCEDIMENTOS)}
+    primeiro_conv = cursor.execute("SELECT COALESCE(MIN(id), 1) FROM convenios").fetchone()[0]
+    desconto_convenio = {primeiro_conv + i: c[2] for i, c in enumerate(CONVENIOS)}
 
-    conta_id = 0
+    # --- Contas e Pagamentos ---
+    proxima_conta = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM contas").fetchone()[0]
+    contas = []
+    pagamentos = []
     for cons_id, medico_id, data_consulta in consultas_realizadas:
         # 80% das consultas realizadas geram conta
         if random.random() > 0.80:
@@ -280,17 +791,14 @@ def _seed_data(cursor):
         if random.random() < 0.3:
             proc_id = random.randint(8, 15)
 
-        # Buscar preço do procedimento
-        cursor.execute("SELECT preco FROM procedimentos WHERE id = ?", (proc_id,))
-        preco = cursor.fetchone()[0]
+        preco = preco_procedimento[proc_id]
 
         # Convênio: 70% das consultas têm convênio
         convenio_id = None
         desconto = 0
         if random.random() < 0.70:
             convenio_id = random.randint(1, 5)  # excluir Particular (id=6)
-            cursor.execute("SELECT desconto_percentual FROM convenios WHERE id = ?", (convenio_id,))
-            desconto = cursor.fetchone()[0]
+            desconto = desconto_convenio[convenio_id]
 
         valor_total = round(preco * (1 - desconto / 100), 2)
 
@@ -309,60 +817,437 @@ def _seed_data(cursor):
             valor_pago = 0
             data_pagamento = None
 
-        cursor.execute(
-            "INSERT INTO contas (consulta_id, procedimento_id, convenio_id, valor_total, valor_pago, status, data_emissao, data_pagamento) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (cons_id, proc_id, convenio_id, valor_total, valor_pago, status_conta, data_consulta, data_pagamento),
+        current_conta_id = proxima_conta + len(contas)
+        contas.append(
+            (current_conta_id, cons_id, proc_id, convenio_id, valor_total, valor_pago, status_conta, data_consulta, data_pagamento)
         )
-        conta_id += 1
-        current_conta_id = cursor.lastrowid
 
         # Gerar pagamentos para contas pagas ou parciais
         if status_conta in ("pago", "parcial"):
-            forma = random.choice(formas_pagamento)
+            forma = random.choice(FORMAS_PAGAMENTO)
             if convenio_id and random.random() < 0.4:
                 forma = "convenio"
-            cursor.execute(
-                "INSERT INTO pagamentos (conta_id, valor, forma_pagamento, data_pagamento) VALUES (?, ?, ?, ?)",
-                (current_conta_id, valor_pago, forma, data_consulta),
-            )
+            pagamentos.append((current_conta_id, valor_pago, forma, data_consulta))
 
+    cursor.executemany(
+        "INSERT INTO contas (id, consulta_id, procedimento_id, convenio_id, valor_total, valor_pago, status, data_emissao, data_pagamento) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        contas,
+    )
+    cursor.executemany(
+        "INSERT INTO pagamentos (conta_id, valor, forma_pagamento, data_pagamento) VALUES (?, ?, ?, ?)",
+        pagamentos,
+    )
 
-def get_schema():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-    schemas = [row[0] for row in cursor.fetchall() if row[0]]
-    conn.close()
-    return "\n\n".join(schemas)
 
+# Cache de resultados de execute_query / execute_query_raw
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MB", "64")) * 1024 * 1024
 
-def execute_query(sql):
-    conn = sqlite3.connect(DB_PATH)
+# SQL cujo resultado muda sem que o banco mude. Qualquer 'now' (date, strftime, julianday...)
+# fica fora: é UTC e pode mudar de dia antes da data local que valida o cache
+_NON_DETERMINISTIC = re.compile(
+    r"""['"]now['"]|\bcurrent_(?:date|time|timestamp)\b|"""
+    r"\b(?:random|randomblob|changes|total_changes|last_insert_rowid)\s*\(",
+    re.IGNORECASE,
+)
+
+
+class ResultCache:
+    """Cache LRU de DataFrames por (SQL, parâmetros), limitado em bytes.
+
+    O cache inteiro é descartado quando o banco muda: ``PRAGMA data_version`` de uma
+    conexão dedicada detecta commits de qualquer outra conexão, e o inode/mtime do
+    arquivo detecta a troca do arquivo. A data do dia também entra na validade,
+    porque o SQL gerado pelo modelo usa ``date('now')``.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stamp = None
+        self._watcher = None
+        self._watcher_path = None
+        self._lock = threading.Lock()
+
+    def _current_stamp(self):
+        if self._watcher is None or self._watcher_path != DB_PATH:
+            if self._watcher is not None:
+                self._watcher.close()
+            self._watcher = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+            self._watcher_path = DB_PATH
+        data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+        st = os.stat(DB_PATH)
+        return (DB_PATH, data_version, st.st_ino, st.st_mtime_ns, date.today().isoformat())
+
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def get(self, key):
+        """Retorna (DataFrame ou None, marca de validade a ser passada para put)."""
+        with self._lock:
+            stamp = self._current_stamp()
+            if stamp != self._stamp:
+                self._clear()
+                self._stamp = stamp
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, stamp
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy(), stamp
+
+    def put(self, key, df, stamp):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            # O banco mudou enquanto a consulta rodava: o resultado pode já estar velho
+            if stamp != self._stamp:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (df.copy(), nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+            }
+
+
+_result_cache = ResultCache()
+
+
+def _cache_key(sql, params):
+    if params is None:
+        return (sql, ())
+    if isinstance(params, dict):
+        return (sql, tuple(sorted(params.items())))
+    return (sql, tuple(params))
+
+
+def _cached_read(sql, params, read):
+    """Executa ``read()`` passando pelo cache de resultados quando o SQL é determinístico."""
+    if _NON_DETERMINISTIC.search(sql):
+        return read()
     try:
-        df = pd.read_sql_query(sql, conn)
-
-        # Renomeia colunas duplicadas para evitar erro no Streamlit / PyArrow
-        new_cols = []
-        col_counts = {}
-        for col in df.columns:
-            if col not in col_counts:
-                col_counts[col] = 1
-                new_cols.append(col)
-            else:
-                col_counts[col] += 1
-                new_cols.append(f"{col}_{col_counts[col]}")
-        df.columns = new_cols
+        key = _cache_key(sql, params)
+        hash(key)
+    except TypeError:
+        return read()
 
+    df, stamp = _result_cache.get(key)
+    if df is not None:
         return df
+    df = read()
+    _result_cache.put(key, df, stamp)
+    return df
+
+
+def clear_result_cache():
+    _result_cache.clear()
+
+
+def result_cache_stats():
+    """Entradas, memória ocupada (bytes) e acertos do cache de resultados."""
+    return _result_cache.stats()
+
+
+# DDL renderido por banco: DB_PATH -> (schema_version, texto)
+_schema_cache = {}
+_schema_lock = threading.Lock()
+
+
+def get_schema_version():
+    """Contador do SQLite incrementado a cada mudança de DDL."""
+    with get_pool().connection() as conn:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def get_data_version():
+    """Identificador do estado dos dados que vale entre processos e reinícios.
+
+    ``PRAGMA data_version`` só é comparável dentro da mesma conexão, então para caches
+    em disco usamos a tabela data_version (migração 4): só muda quando uma linha das
+    tabelas de dados muda, não quando o banco é aberto, fechado ou passa por checkpoint.
+    """
+    with get_pool().connection() as conn:
+        origin, version = conn.execute("SELECT origin, version FROM data_version").fetchone()
+    return f"{origin}:{version}"
+
+
+def get_schema():
+    """Retorna o DDL das tabelas; sqlite_master só é relido quando o esquema muda."""
+    with get_pool().connection() as conn:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        cached = _schema_cache.get(DB_PATH)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        # Rollups e data_version são internos e ficam fora do prompt do modelo
+        cursor = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'rollup_%' "
+            "AND name != 'data_version'"
+        )
+        schemas = [row[0] for row in cursor.fetchall() if row[0]]
+
+    schema = "\n\n".join(schemas)
+    with _schema_lock:
+        _schema_cache[DB_PATH] = (version, schema)
+    return schema
+
+
+class QueryTimeout(sqlite3.OperationalError):
+    """Consulta interrompida por exceder o orçamento de tempo ou de instruções."""
+
+
+@contextmanager
+def _query_budget(conn, timeout, max_steps):
+    """Interrompe o statement em execução em ``conn`` quando passa de ``timeout`` segundos
+    ou de ``max_steps`` instruções da VM (o progress handler do SQLite roda a cada
+    PROGRESS_INTERVAL instruções, inclusive durante o fetch).
+
+    Produz o estado do handler; ``estado["passos"]`` é o total aproximado de instruções.
+    """
+    estado = {"passos": 0, "motivo": None}
+    if not timeout and not max_steps:
+        yield estado
+        return
+
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def handler():
+        estado["passos"] += PROGRESS_INTERVAL
+        if max_steps and estado["passos"] > max_steps:
+            estado["motivo"] = f"excedeu o limite de {max_steps:,} instruções"
+        elif deadline is not None and time.monotonic() > deadline:
+            estado["motivo"] = f"excedeu o limite de {timeout:g} s"
+        return 1 if estado["motivo"] else 0
+
+    conn.set_progress_handler(handler, PROGRESS_INTERVAL)
+    try:
+        yield estado
+    except sqlite3.OperationalError as e:
+        if estado["motivo"]:
+            raise QueryTimeout(f"Consulta interrompida: {estado['motivo']}.") from e
+        raise
     finally:
-        conn.close()
+        # A conexão volta para o pool; o próximo uso não pode herdar o handler
+        conn.set_progress_handler(None, 0)
 
 
-def execute_query_raw(sql, params=None):
-    """Executa query parametrizada e retorna DataFrame."""
-    conn = sqlite3.connect(DB_PATH)
+def _fetch_limited(conn, sql, max_rows):
+    """Lê no máximo ``max_rows`` linhas; ``df.attrs["truncado"]`` indica se havia mais."""
+    cursor = conn.execute(sql)
     try:
-        df = pd.read_sql_query(sql, conn, params=params)
-        return df
+        if cursor.description is None:
+            df = pd.DataFrame()
+            df.attrs["truncado"] = False
+            return df
+        columns = [d[0] for d in cursor.description]
+        rows = cursor.fetchmany(max_rows + 1) if max_rows else cursor.fetchall()
     finally:
-        conn.close()
+        cursor.close()
+
+    truncated = bool(max_rows) and len(rows) > max_rows
+    # Mesma conversão que pd.read_sql_query faz
+    df = pd.DataFrame.from_records(rows[:max_rows] if truncated else rows, columns=columns, coerce_float=True)
+    df.attrs["truncado"] = truncated
+    return df
+
+
+# --- Log de consultas lentas ---
+
+_slow_lock = threading.Lock()
+_slow_recent = deque(maxlen=SLOW_QUERY_MEMORY)
+_slow_logger = None
+
+
+def _slow_query_logger():
+    """Logger com RotatingFileHandler em SLOW_QUERY_LOG (criado no primeiro registro)."""
+    global _slow_logger
+    if _slow_logger is None:
+        logger = logging.getLogger("database.slow_queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.handlers.RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _slow_logger = logger
+    return _slow_logger
+
+
+def _params_shape(params):
+    """Só os tipos dos parâmetros: os valores (nomes de pacientes etc.) não vão para o log."""
+    if params is None:
+        return ""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+def _record_query(entry):
+    with _slow_lock:
+        _slow_recent.append(entry)
+        if SLOW_QUERY_LOG:
+            try:
+                _slow_query_logger().info(json.dumps(entry, ensure_ascii=False))
+            except OSError:
+                pass  # log em disco indisponível não pode derrubar a consulta
+
+
+@contextmanager
+def _trace_query(conn, source, sql, params=None):
+    """Mede o statement executado dentro do bloco e registra se passar de SLOW_QUERY_MS.
+
+    O bloco preenche ``trace["rows"]`` (e ``trace["steps"]``, quando conhecido); consultas
+    lentas levam junto o EXPLAIN QUERY PLAN, feito na mesma conexão depois da execução.
+    """
+    trace = {"rows": None, "steps": None}
+    start = time.perf_counter()
+    error = None
+    try:
+        yield trace
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        slow = duration_ms >= SLOW_QUERY_MS
+        if slow or SQL_TRACE:
+            entry = {
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "source": source,
+                "duration_ms": round(duration_ms, 1),
+                "rows": trace["rows"],
+                "steps": trace["steps"],
+                "slow": slow,
+                "sql": " ".join(sql.split()),
+                "params": _params_shape(params),
+                "error": error,
+                "plan": None,
+            }
+            if slow:
+                try:
+                    entry["plan"] = [
+                        row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+                    ]
+                except sqlite3.Error:
+                    pass
+            _record_query(entry)
+
+
+def _tail_lines(path, limit, block_size=64 * 1024):
+    """Últimas ``limit`` linhas do arquivo, lendo blocos a partir do fim."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # Uma quebra a mais garante que a primeira linha do trecho lido está inteira
+        while position > 0 and data.count(b"\n") <= limit:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if position > 0:
+        lines = lines[1:]
+    return lines[-limit:] if limit > 0 else []
+
+
+def slow_queries(limit=100):
+    """Registros mais recentes (do mais novo para o mais antigo).
+
+    Lê o fim do arquivo de log, que reúne todos os processos do servidor, sem segurar
+    o lock das consultas; sem arquivo, usa os registros em memória deste processo.
+    """
+    if SLOW_QUERY_LOG and os.path.exists(SLOW_QUERY_LOG):
+        try:
+            lines = _tail_lines(SLOW_QUERY_LOG, limit)
+        except FileNotFoundError:
+            lines = []  # removido na rotação entre o exists e o open
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries[::-1]
+    with _slow_lock:
+        return list(_slow_recent)[::-1][:limit]
+
+
+def clear_slow_queries():
+    """Esvazia os registros em memória e o arquivo de log atual (os arquivos rotacionados ficam)."""
+    with _slow_lock:
+        _slow_recent.clear()
+        if SLOW_QUERY_LOG and os.path.exists(SLOW_QUERY_LOG):
+            if _slow_logger is not None:
+                for handler in _slow_logger.handlers:
+                    handler.flush()
+            open(SLOW_QUERY_LOG, "w").close()
+
+
+def execute_query(sql, use_cache=True, timeout=QUERY_TIMEOUT, max_steps=QUERY_MAX_STEPS, max_rows=QUERY_MAX_ROWS):
+    """Executa o SQL gerado pelo modelo com orçamento de tempo/instruções e limite de linhas.
+
+    Levanta QueryTimeout se o orçamento estourar. Se havia mais que ``max_rows`` linhas,
+    o DataFrame traz só as primeiras e ``df.attrs["truncado"]`` é True.
+    """
+    if use_cache:
+        return _cached_read(
+            sql, {"max_rows": max_rows},
+            lambda: execute_query(sql, False, timeout, max_steps, max_rows),
+        )
+
+    with get_pool().connection() as conn, _trace_query(conn, "execute_query", sql) as trace:
+        with _query_budget(conn, timeout, max_steps) as budget:
+            df = _fetch_limited(conn, sql, max_rows)
+        trace["rows"] = len(df)
+        trace["steps"] = budget["passos"] or None
+
+    # Renomeia colunas duplicadas para evitar erro no Streamlit / PyArrow
+    new_cols = []
+    col_counts = {}
+    for col in df.columns:
+        if col not in col_counts:
+            col_counts[col] = 1
+            new_cols.append(col)
+        else:
+            col_counts[col] += 1
+            new_cols.append(f"{col}_{col_counts[col]}")
+    df.columns = new_cols
+
+    return df
+
+
+def execute_query_raw(sql, params=None, use_cache=True):
+    """Executa query parametrizada e retorna DataFrame."""
+    if use_cache:
+        return _cached_read(sql, params, lambda: execute_query_raw(sql, params, use_cache=False))
+
+    with get_pool().connection() as conn, _trace_query(conn, "execute_query_raw", sql, params) as trace:
+        df = pd.read_sql_query(sql, conn, params=params)
+        trace["rows"] = len(df)
+    return df
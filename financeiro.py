@@ -0,0 +1,101 @@
+import pandas as pd
+
+from database import execute_query_raw
+
+# Os agregados saem dos rollups diários mantidos por triggers (ver database.py), então o
+# custo depende do número de dias do período, não do número de contas.
+
+# Uma linha por dia x médico x procedimento x convênio x status, já com nomes
+_SQL_CONTAS = """
+    SELECT r.dia AS data_emissao, r.status, r.n_contas, r.n_consultas, r.valor_total, r.valor_pago,
+           m.nome AS medico, m.especialidade,
+           COALESCE(cv.nome, 'Particular') AS convenio
+    FROM rollup_contas_diario r
+    JOIN medicos m ON r.medico_id = m.id
+    LEFT JOIN convenios cv ON r.convenio_id = cv.id
+    WHERE r.dia BETWEEN ? AND ? AND r.n_contas <> 0
+"""
+
+# Pagamentos são filtrados pela data do pagamento, não pela emissão da conta
+_SQL_FORMAS_PAGAMENTO = """
+    SELECT forma_pagamento, SUM(n_pagamentos) AS qtd, SUM(valor) AS total
+    FROM rollup_pagamentos_diario
+    WHERE dia BETWEEN ? AND ?
+    GROUP BY forma_pagamento
+    HAVING SUM(n_pagamentos) > 0
+    ORDER BY total DESC
+"""
+
+
+def _kpis(contas):
+    pendentes = contas[contas["status"].isin(["pendente", "parcial"])]
+    contas_por_status = contas.groupby("status")["n_contas"].sum()
+    return {
+        "receita_total": float(contas["valor_pago"].sum()),
+        "valor_bruto": float(contas["valor_total"].sum()),
+        "total_contas": int(contas["n_contas"].sum()),
+        "contas_pagas": int(contas_por_status.get("pago", 0)),
+        "contas_pend": int(contas_por_status.get("pendente", 0)),
+        "contas_parc": int(contas_por_status.get("parcial", 0)),
+        "pacientes_atend": int(contas["n_consultas"].sum()),
+        "valor_pendente": float((pendentes["valor_total"] - pendentes["valor_pago"]).sum()),
+    }
+
+
+def _faturamento_por(contas, colunas):
+    """Consultas e valor recebido por grupo, do maior para o menor."""
+    if contas.empty:
+        return pd.DataFrame(columns=[*colunas, "consultas", "total"])
+    return (
+        contas.groupby(colunas, as_index=False)
+        .agg(consultas=("n_consultas", "sum"), total=("valor_pago", "sum"))
+        .sort_values("total", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def snapshot_financeiro(inicio, fim, inicio_serie=None):
+    """Agregados financeiros de um período (datas ISO, inclusivas) numa única leitura dos rollups.
+
+    Retorna um dict com:
+      - kpis: receita_total, valor_bruto, total_contas, contas_pagas, contas_pend,
+        contas_parc, pacientes_atend, valor_pendente
+      - especialidades: especialidade, consultas, total (só contas pagas ou parciais)
+      - medicos: nome, especialidade, consultas, total (só contas pagas ou parciais)
+      - convenios: convenio, qtd, total
+      - formas_pagamento: forma_pagamento, qtd, total
+      - receita_diaria: data, receita, de ``inicio_serie`` (padrão: ``inicio``) até ``fim``
+    """
+    inicio_serie = inicio_serie or inicio
+    contas = execute_query_raw(_SQL_CONTAS, (min(inicio, inicio_serie), fim))
+    formas = execute_query_raw(_SQL_FORMAS_PAGAMENTO, (inicio, fim))
+
+    periodo = contas[contas["data_emissao"] >= inicio]
+    com_pagamento = periodo[periodo["status"] != "pendente"]
+
+    convenios = (
+        periodo.groupby("convenio", as_index=False)
+        .agg(qtd=("n_contas", "sum"), total=("valor_pago", "sum"))
+        .sort_values("total", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    serie = contas[contas["data_emissao"] >= inicio_serie]
+    receita_diaria = (
+        serie.groupby("data_emissao", as_index=False)["valor_pago"].sum()
+        .rename(columns={"data_emissao": "data", "valor_pago": "receita"})
+        .query("receita > 0")
+        .sort_values("data")
+        .reset_index(drop=True)
+    )
+
+    return {
+        "inicio": inicio,
+        "fim": fim,
+        "kpis": _kpis(periodo),
+        "especialidades": _faturamento_por(com_pagamento, ["especialidade"]),
+        "medicos": _faturamento_por(com_pagamento, ["medico", "especialidade"]).rename(columns={"medico": "nome"}),
+        "convenios": convenios,
+        "formas_pagamento": formas,
+        "receita_diaria": receita_diaria,
+    }
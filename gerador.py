@@ -0,0 +1,272 @@
+"""Gerador de dados sintéticos em escala para testes de carga.
+
+Uso:
+    python gerador.py --saida hospital_grande.db --escala 10 --anos 5 --processos 4
+
+Com escala 1 são 10.000 pacientes e 50 médicos; cada médico atende 6-16 consultas
+por dia. O resultado depende só de --seed, --escala, --anos e da data de hoje — o
+número de processos não altera os dados.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+import database
+from database import CONVENIOS, DIAGNOSTICOS, FORMAS_PAGAMENTO, HORARIOS, PROCEDIMENTOS
+
+PACIENTES_POR_ESCALA = 10_000
+MEDICOS_POR_ESCALA = 50
+CONSULTAS_POR_MEDICO_DIA = (6, 16)
+DIAS_POR_BLOCO = 30  # unidade de trabalho de cada processo e de cada transação
+
+NOMES = [
+    "Ana", "Carlos", "Maria", "João", "Fernanda", "Rafael", "Juliana", "Pedro",
+    "Camila", "Lucas", "Beatriz", "Thiago", "Larissa", "Gabriel", "Isabela", "Diego",
+    "Natália", "Rodrigo", "Vanessa", "Marcelo", "Patrícia", "André", "Carolina", "Felipe",
+    "Renata", "Bruno", "Aline", "Vinícius", "Daniela", "Eduardo",
+]
+SOBRENOMES = [
+    "Silva", "Oliveira", "Santos", "Pereira", "Costa", "Souza", "Lima", "Almeida",
+    "Rodrigues", "Ferreira", "Nascimento", "Monteiro", "Duarte", "Carvalho", "Moreira",
+    "Fernandes", "Vieira", "Pinto", "Gomes", "Dias", "Freitas", "Lopes", "Barros",
+    "Cardoso", "Machado", "Teixeira", "Castro", "Ramos", "Cunha", "Martins",
+]
+ESPECIALIDADES = [
+    "Cardiologia", "Dermatologia", "Ortopedia", "Pediatria", "Neurologia", "Ginecologia",
+    "Oftalmologia", "Psiquiatria", "Urologia", "Endocrinologia", "Clínica Geral",
+    "Pneumologia", "Gastroenterologia", "Oncologia", "Cirurgia Geral",
+]
+UFS = ["SP", "RJ", "MG", "PR", "RS", "BA", "DF", "PE", "PA"]
+
+# Preços e descontos indexados pelo id gerado (as tabelas de catálogo começam vazias)
+_PRECO = {i: p[2] for i, p in enumerate(PROCEDIMENTOS, start=1)}
+_DESCONTO = {i: c[2] for i, c in enumerate(CONVENIOS, start=1)}
+_N_CONVENIOS_PAGOS = len(CONVENIOS) - 1  # Particular (último) não é sorteado, como em _seed_data
+
+
+def _procedimento_medico(medico_id):
+    # Mesmo critério de _seed_data: as seis primeiras especialidades têm consulta própria
+    indice = (medico_id - 1) % len(ESPECIALIDADES)
+    return indice + 1 if indice < 6 else 7
+
+
+def _gerar_pacientes(rng, n):
+    pacientes = []
+    for i in range(1, n + 1):
+        nome, sobrenome = rng.choice(NOMES), rng.choice(SOBRENOMES)
+        nascimento = date(1940, 1, 1) + timedelta(days=rng.randrange(80 * 365))
+        email = f"{nome}.{sobrenome}{i}@email.com".lower()
+        telefone = f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+        pacientes.append((i, f"{nome} {sobrenome}", nascimento.isoformat(), telefone, email))
+    return pacientes
+
+
+def _gerar_medicos(rng, n):
+    medicos = []
+    for i in range(1, n + 1):
+        titulo = rng.choice(["Dr.", "Dra."])
+        nome = f"{titulo} {rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+        especialidade = ESPECIALIDADES[(i - 1) % len(ESPECIALIDADES)]
+        medicos.append((i, nome, especialidade, f"CRM-{rng.choice(UFS)} {10000 + i}"))
+    return medicos
+
+
+def _gerar_bloco(args):
+    """Consultas, contas e pagamentos de um intervalo de dias.
+
+    Ids são relativos ao bloco (começam em 0); quem grava soma o deslocamento. O gerador
+    aleatório depende só da seed e do primeiro dia, então o bloco é o mesmo em qualquer
+    processo e em qualquer ordem de execução.
+    """
+    seed, inicio, n_dias, hoje, n_medicos, n_pacientes = args
+    rng = random.Random(f"{seed}:{inicio.isoformat()}")
+    randint, choice, rand, uniform = rng.randint, rng.choice, rng.random, rng.uniform
+    minimo, maximo = CONSULTAS_POR_MEDICO_DIA
+
+    consultas, contas, pagamentos = [], [], []
+    for d in range(n_dias):
+        dia = inicio + timedelta(days=d)
+        dia_str = dia.isoformat()
+        for medico_id in range(1, n_medicos + 1):
+            horas = rng.sample(HORARIOS, min(randint(minimo, maximo), len(HORARIOS)))
+            horas.sort()
+            for hora in horas:
+                if dia == hoje:
+                    status = choice(["agendada", "agendada", "realizada"])
+                else:
+                    status = "realizada"
+                consulta = len(consultas)
+                consultas.append((consulta, randint(1, n_pacientes), medico_id, dia_str, hora,
+                                  choice(DIAGNOSTICOS), status))
+
+                # 80% das consultas realizadas geram conta
+                if status != "realizada" or rand() > 0.80:
+                    continue
+                proc_id = _procedimento_medico(medico_id)
+                if rand() < 0.3:
+                    proc_id = randint(8, len(PROCEDIMENTOS))
+
+                convenio_id = None
+                desconto = 0
+                if rand() < 0.70:
+                    convenio_id = randint(1, _N_CONVENIOS_PAGOS)
+                    desconto = _DESCONTO[convenio_id]
+                valor_total = round(_PRECO[proc_id] * (1 - desconto / 100), 2)
+
+                r = rand()
+                if r < 0.65:
+                    status_conta, valor_pago, data_pagamento = "pago", valor_total, dia_str
+                elif r < 0.85:
+                    status_conta, valor_pago, data_pagamento = "parcial", round(valor_total * uniform(0.3, 0.7), 2), dia_str
+                else:
+                    status_conta, valor_pago, data_pagamento = "pendente", 0, None
+
+                conta = len(contas)
+                contas.append((conta, consulta, proc_id, convenio_id, valor_total, valor_pago,
+                               status_conta, dia_str, data_pagamento))
+                if status_conta != "pendente":
+                    forma = choice(FORMAS_PAGAMENTO)
+                    if convenio_id and rand() < 0.4:
+                        forma = "convenio"
+                    pagamentos.append((conta, valor_pago, forma, dia_str))
+
+    return consultas, contas, pagamentos
+
+
+def _blocos(seed, hoje, anos, n_medicos, n_pacientes):
+    inicio = hoje - timedelta(days=round(anos * 365))
+    while inicio <= hoje:
+        n_dias = min(DIAS_POR_BLOCO, (hoje - inicio).days + 1)
+        yield seed, inicio, n_dias, hoje, n_medicos, n_pacientes
+        inicio += timedelta(days=n_dias)
+
+
+def gerar(saida, escala=1.0, anos=1.0, seed=42, processos=1, hoje=None, log=print):
+    """Cria ``saida`` do zero com o esquema atual e dados sintéticos. Retorna as contagens por tabela."""
+    hoje = hoje or date.today()
+    n_pacientes = max(1, int(PACIENTES_POR_ESCALA * escala))
+    n_medicos = max(1, int(MEDICOS_POR_ESCALA * escala))
+    inicio_total = time.perf_counter()
+
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(saida + sufixo):
+            os.remove(saida + sufixo)
+
+    # Esquema pelas migrações normais, sem os dados de exemplo
+    caminho_anterior = database.DB_PATH
+    database.DB_PATH = saida
+    try:
+        database.init_db(seed=False)
+    finally:
+        database.DB_PATH = caminho_anterior
+
+    conn = sqlite3.connect(saida, isolation_level=None)
+    # Arquivo novo: se a carga falhar ele é descartado, então dispensa journal e fsync
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+    cursor = conn.cursor()
+    totais = {"pacientes": n_pacientes, "medicos": n_medicos, "consultas": 0, "contas": 0, "pagamentos": 0}
+    try:
+        rng = random.Random(seed)
+        cursor.execute("BEGIN")
+        # Os rollups, a versão dos dados e os índices secundários são refeitos de uma vez no final
+        database.drop_rollup_triggers(cursor)
+        database.drop_data_version_triggers(cursor)
+        database.drop_managed_indexes(cursor)
+        cursor.executemany(
+            "INSERT INTO pacientes (id, nome, data_nascimento, telefone, email) VALUES (?, ?, ?, ?, ?)",
+            _gerar_pacientes(rng, n_pacientes),
+        )
+        cursor.executemany(
+            "INSERT INTO medicos (id, nome, especialidade, crm) VALUES (?, ?, ?, ?)",
+            _gerar_medicos(rng, n_medicos),
+        )
+        cursor.executemany(
+            "INSERT INTO convenios (nome, tipo, desconto_percentual) VALUES (?, ?, ?)", CONVENIOS
+        )
+        cursor.executemany(
+            "INSERT INTO procedimentos (nome, categoria, preco) VALUES (?, ?, ?)", PROCEDIMENTOS
+        )
+        cursor.execute("COMMIT")
+
+        blocos = list(_blocos(seed, hoje, anos, n_medicos, n_pacientes))
+        pool = Pool(processos) if processos > 1 else None
+        try:
+            # imap preserva a ordem dos blocos, então os ids não dependem do paralelismo
+            resultados = pool.imap(_gerar_bloco, blocos) if pool else map(_gerar_bloco, blocos)
+            for n, (consultas, contas, pagamentos) in enumerate(resultados, start=1):
+                base_consulta = totais["consultas"] + 1
+                base_conta = totais["contas"] + 1
+                cursor.execute("BEGIN")
+                cursor.executemany(
+                    f"INSERT INTO consultas (id, paciente_id, medico_id, data_consulta, hora_consulta, diagnostico, status) "
+                    f"VALUES (? + {base_consulta}, ?, ?, ?, ?, ?, ?)",
+                    consultas,
+                )
+                cursor.executemany(
+                    f"INSERT INTO contas (id, consulta_id, procedimento_id, convenio_id, valor_total, valor_pago, status, data_emissao, data_pagamento) "
+                    f"VALUES (? + {base_conta}, ? + {base_consulta}, ?, ?, ?, ?, ?, ?, ?)",
+                    contas,
+                )
+                cursor.executemany(
+                    f"INSERT INTO pagamentos (conta_id, valor, forma_pagamento, data_pagamento) "
+                    f"VALUES (? + {base_conta}, ?, ?, ?)",
+                    pagamentos,
+                )
+                cursor.execute("COMMIT")
+                totais["consultas"] += len(consultas)
+                totais["contas"] += len(contas)
+                totais["pagamentos"] += len(pagamentos)
+                log(f"bloco {n}/{len(blocos)}: {totais['consultas']:,} consultas "
+                    f"({time.perf_counter() - inicio_total:.0f}s)")
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        log("recalculando rollups...")
+        cursor.execute("BEGIN")
+        database.rebuild_rollups(cursor)
+        database.create_rollup_triggers(cursor)
+        database.create_data_version_triggers(cursor)
+        database.bump_data_version(cursor)
+        cursor.execute("COMMIT")
+        log("criando índices...")
+        database.create_managed_indexes(cursor, analyze=False)
+        cursor.execute("ANALYZE")
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+    log(f"concluído em {time.perf_counter() - inicio_total:.0f}s: "
+        + ", ".join(f"{v:,} {k}" for k, v in totais.items()))
+    return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco hospitalar sintético em escala.")
+    parser.add_argument("--saida", default="hospital_sintetico.db", help="arquivo SQLite a criar (é sobrescrito)")
+    parser.add_argument("--escala", type=float, default=1.0,
+                        help=f"fator de escala: {PACIENTES_POR_ESCALA:,} pacientes e {MEDICOS_POR_ESCALA} médicos por unidade")
+    parser.add_argument("--anos", type=float, default=1.0, help="anos de histórico até hoje")
+    parser.add_argument("--seed", type=int, default=42, help="semente; mesma seed gera o mesmo banco")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="processos gerando blocos em paralelo (1 = sem multiprocessing)")
+    args = parser.parse_args()
+
+    if args.escala <= 0 or args.anos < 0 or args.processos < 1:
+        parser.error("--escala deve ser > 0, --anos >= 0 e --processos >= 1")
+    if os.path.abspath(args.saida) == os.path.abspath(database.DB_PATH):
+        parser.error(f"--saida não pode ser o banco da aplicação ({database.DB_PATH})")
+
+    gerar(args.saida, args.escala, args.anos, args.seed, args.processos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Gráficos do dashboard HTML como SVG inline, sem JavaScript nem CDN.
+
+O tamanho do SVG não depende do período: séries longas são reduzidas por LTTB
+(Largest-Triangle-Three-Buckets) a no máximo SVG_MAX_PONTOS pontos e categorias
+além de SVG_MAX_CATEGORIAS são somadas em "Outros".
+"""
+import math
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+SVG_MAX_PONTOS = 240      # pontos da linha de uma série temporal longa
+SVG_MAX_BARRAS = 62       # até aqui a série diária sai em barras, uma por dia
+SVG_MAX_CATEGORIAS = 10   # fatias / barras horizontais
+
+LARGURA = 760
+ALTURA = 320
+CORES_PIZZA = ["#FF6384", "#36A2EB", "#FFCE56", "#4BC0C0", "#9966FF", "#FF9F40", "#8BC34A", "#607D8B"]
+
+
+def lttb(x, y, limite):
+    """Índices dos pontos mantidos pelo LTTB: o primeiro, o último e, em cada balde
+    intermediário, o ponto que forma o maior triângulo com o anterior e a média do próximo."""
+    n = len(x)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bordas = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(limite - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        prox_inicio, prox_fim = fim, bordas[i + 2] if i + 2 < len(bordas) else n
+        media_x = x[prox_inicio:prox_fim].mean() if prox_fim > prox_inicio else x[-1]
+        media_y = y[prox_inicio:prox_fim].mean() if prox_fim > prox_inicio else y[-1]
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+def _moeda_curta(valor):
+    """R$ 950 / R$ 12,3 mil / R$ 1,2 mi — para eixos e rótulos."""
+    if abs(valor) >= 1e6:
+        return f"R$ {valor / 1e6:.1f} mi".replace(".", ",")
+    if abs(valor) >= 1e3:
+        return f"R$ {valor / 1e3:.1f} mil".replace(".", ",")
+    return f"R$ {valor:.0f}"
+
+
+def _escala(maximo):
+    """Topo "redondo" do eixo Y e o passo das 4 linhas de grade."""
+    if maximo <= 0:
+        return 1.0, 0.25
+    passo = maximo / 4
+    magnitude = 10 ** math.floor(math.log10(passo))
+    passo = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= passo)
+    return passo * 4, passo
+
+
+def _svg(titulo, corpo, altura=ALTURA):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {LARGURA} {altura}" width="100%" '
+        f'role="img" aria-label="{escape(titulo)}" font-family="Segoe UI, sans-serif" font-size="11">'
+        f'<text x="{LARGURA / 2:.0f}" y="20" text-anchor="middle" font-size="15" fill="#1a1a2e">{escape(titulo)}</text>'
+        f"{corpo}</svg>"
+    )
+
+
+def _agrupar_categorias(rotulos, valores, limite=SVG_MAX_CATEGORIAS):
+    """Maiores ``limite - 1`` categorias e o resto somado em "Outros"."""
+    rotulos = [str(r) for r in rotulos]
+    valores = [float(v) for v in valores]
+    if len(rotulos) <= limite:
+        return rotulos, valores
+    ordem = sorted(range(len(valores)), key=lambda i: -valores[i])
+    manter = ordem[:limite - 1]
+    return [rotulos[i] for i in manter] + ["Outros"], [valores[i] for i in manter] + [sum(valores[i] for i in ordem[limite - 1:])]
+
+
+def svg_serie_diaria(datas, valores, titulo, cor="#4CAF50"):
+    """Receita por dia: barras até SVG_MAX_BARRAS dias, linha reduzida por LTTB acima disso."""
+    datas = pd.to_datetime(pd.Series(datas), errors="coerce")
+    valores = pd.to_numeric(pd.Series(valores), errors="coerce").fillna(0).to_numpy(dtype=float)
+    esq, dir_, topo, base = 70, 20, 40, ALTURA - 50
+    largura, altura = LARGURA - esq - dir_, base - topo
+    maximo, passo = _escala(float(valores.max()) if len(valores) else 0)
+    partes = []
+    for k in range(5):
+        y = base - altura * k * passo / maximo
+        partes.append(f'<line x1="{esq}" y1="{y:.1f}" x2="{LARGURA - dir_}" y2="{y:.1f}" stroke="#e0e0e0"/>')
+        partes.append(f'<text x="{esq - 6}" y="{y + 4:.1f}" text-anchor="end" fill="#666">{_moeda_curta(k * passo)}</text>')
+
+    n = len(valores)
+    if n == 0:
+        return _svg(titulo, "".join(partes))
+    dias = ((datas - datas.iloc[0]).dt.days.fillna(0)).to_numpy(dtype=float)
+    extensao = max(dias[-1], 1.0)
+
+    def rotulo(i):
+        return datas.iloc[i].strftime("%d/%m/%Y") if pd.notna(datas.iloc[i]) else ""
+
+    if n <= SVG_MAX_BARRAS:
+        passo_x = largura / max(extensao + 1, 1)
+        barra = max(passo_x * 0.8, 1.0)
+        for i, (d, v) in enumerate(zip(dias, valores)):
+            x = esq + d * passo_x + (passo_x - barra) / 2
+            h = altura * v / maximo
+            partes.append(
+                f'<rect x="{x:.1f}" y="{base - h:.1f}" width="{barra:.1f}" height="{h:.1f}" fill="{cor}">'
+                f"<title>{rotulo(i)}: {_moeda_curta(v)}</title></rect>"
+            )
+        posicoes = esq + dias * passo_x + passo_x / 2
+    else:
+        manter = lttb(dias, valores, SVG_MAX_PONTOS)
+        xs = esq + dias[manter] / extensao * largura
+        ys = base - altura * valores[manter] / maximo
+        pontos = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+        partes.append(f'<polygon points="{esq:.1f},{base} {pontos} {xs[-1]:.1f},{base}" fill="{cor}" fill-opacity="0.15"/>')
+        partes.append(f'<polyline points="{pontos}" fill="none" stroke="{cor}" stroke-width="1.5"/>')
+        posicoes = esq + dias / extensao * largura
+
+    # Até 8 rótulos no eixo X, igualmente espaçados
+    for i in np.unique(np.linspace(0, n - 1, min(n, 8)).round().astype(int)):
+        texto = rotulo(i)[:5] if n <= SVG_MAX_BARRAS else rotulo(i)
+        partes.append(f'<text x="{posicoes[i]:.1f}" y="{base + 16}" text-anchor="middle" fill="#666">{texto}</text>')
+    partes.append(f'<line x1="{esq}" y1="{base}" x2="{LARGURA - dir_}" y2="{base}" stroke="#999"/>')
+    return _svg(titulo, "".join(partes))
+
+
+def svg_pizza(rotulos, valores, titulo, cores=CORES_PIZZA):
+    """Rosca com legenda (rótulo, valor e percentual)."""
+    rotulos, valores = _agrupar_categorias(rotulos, valores)
+    total = sum(valores)
+    cx, cy, r, r_int = 170, 175, 120, 65
+    partes = []
+    angulo = -math.pi / 2
+    for i, (rotulo, valor) in enumerate(zip(rotulos, valores)):
+        cor = cores[i % len(cores)]
+        fracao = valor / total if total > 0 else 0
+        if fracao >= 0.9999:
+            partes.append(f'<circle cx="{cx}" cy="{cy}" r="{(r + r_int) / 2}" fill="none" stroke="{cor}" stroke-width="{r - r_int}"/>')
+        elif fracao > 0:
+            fim = angulo + 2 * math.pi * fracao
+            grande = 1 if fracao > 0.5 else 0
+            p = [(cx + raio * math.cos(a), cy + raio * math.sin(a)) for raio, a in
+                 ((r, angulo), (r, fim), (r_int, fim), (r_int, angulo))]
+            partes.append(
+                f'<path d="M{p[0][0]:.1f},{p[0][1]:.1f} A{r},{r} 0 {grande} 1 {p[1][0]:.1f},{p[1][1]:.1f} '
+                f'L{p[2][0]:.1f},{p[2][1]:.1f} A{r_int},{r_int} 0 {grande} 0 {p[3][0]:.1f},{p[3][1]:.1f} Z" fill="{cor}">'
+                f"<title>{escape(rotulo)}: {_moeda_curta(valor)}</title></path>"
+            )
+            angulo = fim
+        y = 70 + i * 24
+        partes.append(f'<rect x="340" y="{y - 10}" width="12" height="12" fill="{cor}"/>')
+        partes.append(
+            f'<text x="360" y="{y}" fill="#333">{escape(rotulo)} — {_moeda_curta(valor)} '
+            f"({fracao * 100:.1f}%)</text>"
+        )
+    return _svg(titulo, "".join(partes))
+
+
+def svg_barras_horizontais(rotulos, valores, titulo, cor="#36A2EB"):
+    """Barras horizontais na ordem recebida, com o valor ao fim de cada barra."""
+    rotulos, valores = _agrupar_categorias(rotulos, valores)
+    esq, dir_, topo, linha = 150, 90, 40, 26
+    altura_svg = max(topo + linha * len(rotulos) + 20, 100)
+    maximo = max(valores, default=0) or 1
+    partes = []
+    for i, (rotulo, valor) in enumerate(zip(rotulos, valores)):
+        y = topo + i * linha
+        w = (LARGURA - esq - dir_) * valor / maximo
+        partes.append(f'<text x="{esq - 8}" y="{y + 15}" text-anchor="end" fill="#333">{escape(rotulo[:22])}</text>')
+        partes.append(f'<rect x="{esq}" y="{y + 3}" width="{w:.1f}" height="{linha - 8}" fill="{cor}"/>')
+        partes.append(f'<text x="{esq + w + 6:.1f}" y="{y + 15}" fill="#666">{_moeda_curta(valor)}</text>')
+    return _svg(titulo, "".join(partes), altura_svg)
@@ -0,0 +1,282 @@
+"""Conselheiro de índices: EXPLAIN QUERY PLAN nas consultas geradas e nos relatórios.
+
+Cada SQL analisado tem o plano inspecionado; uma varredura completa (``SCAN tabela``
+sem índice) em tabela grande é registrada no log "indices" e na lista de achados
+recentes, com a sugestão de índice montada a partir dos filtros da própria consulta
+(colunas comparadas com constantes/parâmetros primeiro, depois a de intervalo).
+Com INDEX_ADVISOR=auto a sugestão é criada numa thread de fundo, fora da resposta.
+
+Uso:
+    python indices.py            # confere os índices gerenciados e os planos dos relatórios
+    python indices.py --criar    # cria os gerenciados que faltarem e as sugestões
+"""
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import database
+
+# "log" registra as varreduras e sugere índices, "auto" também os cria, "0" desativa
+INDEX_ADVISOR = os.getenv("INDEX_ADVISOR", "log").lower()
+ADVISOR_MIN_LINHAS = 1000      # tabelas menores que isso são varridas sem problema
+ADVISOR_MEMORIA = 256          # SQLs já analisados lembrados (não repete o EXPLAIN)
+ADVISOR_ACHADOS = 50           # achados recentes guardados para a tela de administração
+
+log = logging.getLogger("indices")
+
+_lock = threading.Lock()
+_analisadas = OrderedDict()
+_achados = deque(maxlen=ADVISOR_ACHADOS)
+_situacao = {}  # (banco, DDL) -> "agendado" | "criado" | "falhou"
+_executor = None
+
+_TABELA = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|LEFT|RIGHT|INNER|OUTER|CROSS|NATURAL|"
+    r"GROUP|ORDER|LIMIT|HAVING|UNION|USING|WINDOW)\b)(\w+))?",
+    re.IGNORECASE,
+)
+_VARREDURA = re.compile(r"^SCAN (\w+)$")
+_OPERADOR = r"(=|==|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bIS\b)"
+_CONSTANTE = re.compile(r"^(\?|:\w|'|-?\d|\(|date\(|datetime\(|strftime\(|NULL\b)", re.IGNORECASE)
+_IGUALDADE = {"=", "==", "IN", "IS"}
+
+
+def plano(sql, params=None):
+    """Linhas "detail" do EXPLAIN QUERY PLAN (parâmetros ausentes são tratados como NULL)."""
+    if params is None:
+        params = (None,) * sql.count("?")
+    with database.get_pool().connection() as conn:
+        return [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def _aliases(sql):
+    """{alias ou nome: tabela} das cláusulas FROM/JOIN."""
+    mapa = {}
+    for tabela, alias in _TABELA.findall(sql):
+        mapa[tabela.lower()] = tabela.lower()
+        if alias:
+            mapa[alias.lower()] = tabela.lower()
+    return mapa
+
+
+def _colunas(conn, tabela):
+    return [linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")]
+
+
+def _indices(conn, tabela):
+    """Colunas de cada índice da tabela, na ordem."""
+    return [
+        [col[2] for col in conn.execute(f"PRAGMA index_info({idx[1]})")]
+        for idx in conn.execute(f"PRAGMA index_list({tabela})")
+    ]
+
+
+def sugerir_colunas(sql, alias, colunas, unica_tabela=False):
+    """Colunas do índice sugerido para ``alias``: igualdades com constante, depois um
+    intervalo; sem nenhum filtro desses, a coluna de junção."""
+    prefixo = rf"\b{re.escape(alias)}\."
+    if unica_tabela:
+        prefixo = rf"(?:{prefixo}|(?<![\w.]))"
+    igualdade, intervalo, juncao = [], [], []
+    for col, operador, lado in re.findall(prefixo + r"(\w+)\s*" + _OPERADOR + r"\s*(\S+)", sql, re.IGNORECASE):
+        if col not in colunas:
+            continue
+        operador = operador.upper()
+        if _CONSTANTE.match(lado):
+            destino = igualdade if operador in _IGUALDADE else intervalo
+        else:
+            destino = juncao
+        if col not in destino:
+            destino.append(col)
+    sugeridas = igualdade + [c for c in intervalo[:1] if c not in igualdade]
+    return sugeridas or juncao[:1]
+
+
+def analisar(sql, params=None, criar=None):
+    """Varreduras completas no plano de ``sql``: lista de dicts com tabela, linhas,
+    índice sugerido (DDL ou None) e situação ("sugerido", "agendado" ou "criado").
+
+    Com ``criar`` o índice é criado antes de retornar; sem ele, INDEX_ADVISOR=auto
+    agenda a criação em segundo plano (agendar_indice).
+    """
+    agendar = criar is None and INDEX_ADVISOR == "auto"
+    aliases = _aliases(sql)
+    achados = []
+    with database.get_pool().connection() as conn:
+        for detalhe in plano(sql, params):
+            m = _VARREDURA.match(detalhe)
+            if not m:
+                continue
+            tabela = aliases.get(m.group(1).lower(), m.group(1).lower())
+            try:
+                linhas = conn.execute(f"SELECT MAX(rowid) FROM {tabela}").fetchone()[0] or 0
+            except sqlite3.Error:
+                continue  # CTE, subconsulta ou view
+            if linhas < ADVISOR_MIN_LINHAS:
+                continue
+            colunas = sugerir_colunas(sql, m.group(1), _colunas(conn, tabela), unica_tabela=len(set(aliases.values())) == 1)
+            sugestao = None
+            # Sem filtro indexável ou já coberto por um índice que o planejador preferiu não usar
+            if colunas and not any(idx[:len(colunas)] == colunas for idx in _indices(conn, tabela)):
+                sugestao = f"CREATE INDEX IF NOT EXISTS idx_auto_{tabela}_{'_'.join(colunas)} ON {tabela} ({', '.join(colunas)})"
+            achados.append({
+                "tabela": tabela, "linhas": linhas, "sugestao": sugestao,
+                "situacao": "sugerido" if sugestao else None,
+            })
+
+    for achado in achados:
+        if achado["sugestao"] and criar:
+            criar_indice(achado["sugestao"])
+            achado["situacao"] = "criado"
+        elif achado["sugestao"] and agendar:
+            achado["situacao"] = agendar_indice(achado["sugestao"])
+        log.warning(
+            "varredura completa de %s (~%d linhas)%s: %s",
+            achado["tabela"], achado["linhas"],
+            f"; {achado['situacao']}: {achado['sugestao']}" if achado["sugestao"] else "",
+            " ".join(sql.split())[:300],
+        )
+    return achados
+
+
+def criar_indice(ddl, caminho=None):
+    """Executa o CREATE INDEX numa conexão de escrita e atualiza as estatísticas dele."""
+    nome = re.search(r"EXISTS\s+(\w+)", ddl).group(1)
+    conn = sqlite3.connect(caminho or database.DB_PATH, timeout=30)
+    try:
+        with conn:
+            conn.execute(ddl)
+            conn.execute(f"ANALYZE {nome}")
+    finally:
+        conn.close()
+
+
+def _criar_em_segundo_plano(chave):
+    caminho, ddl = chave
+    try:
+        criar_indice(ddl, caminho)
+        situacao = "criado"
+    except Exception as e:
+        log.warning("falha ao criar %s: %s", ddl, e)
+        situacao = "falhou"
+    with _lock:
+        _situacao[chave] = situacao
+
+
+def agendar_indice(ddl):
+    """Cria o índice numa thread de fundo e retorna a situação dele.
+
+    CREATE INDEX e ANALYZE numa tabela grande levam segundos e seguram o lock de
+    escrita; fora do caminho da pergunta, a resposta não espera por eles. Um índice
+    já agendado para o mesmo banco não é agendado de novo.
+    """
+    global _executor
+    chave = (database.DB_PATH, ddl)
+    with _lock:
+        if chave in _situacao:
+            return _situacao[chave]
+        _situacao[chave] = "agendado"
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indices")
+    _executor.submit(_criar_em_segundo_plano, chave)
+    return "agendado"
+
+
+def analisar_consulta(sql, params=None):
+    """analisar() com memória por SQL, para o caminho das perguntas: nunca levanta exceção."""
+    if INDEX_ADVISOR not in ("log", "auto"):
+        return []
+    chave = (database.DB_PATH, " ".join(sql.split()))
+    with _lock:
+        if chave in _analisadas:
+            _analisadas.move_to_end(chave)
+            return _analisadas[chave]
+    try:
+        achados = analisar(sql, params)
+    except Exception as e:
+        log.debug("plano indisponível para %s: %s", sql, e)
+        achados = []
+    with _lock:
+        _analisadas[chave] = achados
+        while len(_analisadas) > ADVISOR_MEMORIA:
+            _analisadas.popitem(last=False)
+        for achado in achados:
+            _achados.append(dict(achado, sql=" ".join(sql.split()), banco=database.DB_PATH))
+    return achados
+
+
+def achados_recentes():
+    """Varreduras completas encontradas neste processo, da mais recente para a mais antiga
+    (com a situação atual dos índices agendados)."""
+    with _lock:
+        return [
+            dict(a, situacao=_situacao.get((a["banco"], a["sugestao"]), a["situacao"]))
+            for a in reversed(_achados)
+        ]
+
+
+def consultas_relatorios(hoje=None):
+    """(nome, SQL, parâmetros) das consultas dos relatórios, para conferir os planos."""
+    import financeiro
+    import relatorio_pdf
+
+    hoje = hoje or date.today()
+    inicio_mes, hoje_str = hoje.replace(day=1).isoformat(), hoje.isoformat()
+    ontem_str = (hoje - timedelta(days=1)).isoformat()
+    medico = "AND m.nome = ?"
+    return [
+        ("agenda", relatorio_pdf.SQL_AGENDA.format(filtro_medico=medico), (hoje_str, "")),
+        ("agenda_todos", relatorio_pdf.SQL_AGENDA.format(filtro_medico=""), (hoje_str,)),
+        ("ontem", relatorio_pdf.SQL_ONTEM.format(filtro_medico=medico), (ontem_str, "")),
+        ("diagnosticos_mes", relatorio_pdf.SQL_DIAGNOSTICOS, (inicio_mes, hoje_str)),
+        ("financeiro_contas", financeiro._SQL_CONTAS, (inicio_mes, hoje_str)),
+        ("financeiro_formas", financeiro._SQL_FORMAS_PAGAMENTO, (inicio_mes, hoje_str)),
+        ("contas_emitidas", "SELECT COUNT(*), SUM(valor_total) FROM contas WHERE data_emissao BETWEEN ? AND ?",
+         (inicio_mes, hoje_str)),
+        ("pagamentos_periodo", "SELECT forma_pagamento, SUM(valor) FROM pagamentos WHERE data_pagamento BETWEEN ? AND ? "
+         "GROUP BY forma_pagamento", (inicio_mes, hoje_str)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere índices e planos de execução das consultas dos relatórios.")
+    parser.add_argument("--criar", action="store_true", help="cria os índices gerenciados ausentes e as sugestões")
+    parser.add_argument("--banco", help="arquivo do banco (padrão: DB_PATH)")
+    args = parser.parse_args()
+    if args.banco:
+        database.DB_PATH = args.banco
+    database.init_db(seed=False)
+
+    faltando = database.missing_managed_indexes()
+    print(f"Índices gerenciados: {len(database.MANAGED_INDEXES) - len(faltando)}/{len(database.MANAGED_INDEXES)}")
+    if faltando:
+        print("  ausentes: " + ", ".join(faltando))
+        if args.criar:
+            conn = sqlite3.connect(database.DB_PATH, timeout=30)
+            try:
+                with conn:
+                    database.create_managed_indexes(conn.cursor())
+            finally:
+                conn.close()
+            print("  criados.")
+
+    for nome, sql, params in consultas_relatorios():
+        achados = analisar(sql, params, criar=args.criar)
+        print(f"\n{nome}:")
+        for detalhe in plano(sql, params):
+            print(f"  {detalhe}")
+        for achado in achados:
+            print(f"  ! varredura completa de {achado['tabela']} (~{achado['linhas']:,} linhas)")
+            if achado["sugestao"]:
+                print(f"    {achado['situacao']}: {achado['sugestao']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    main()
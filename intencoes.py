@@ -0,0 +1,121 @@
+import difflib
+import re
+
+from cache import normalizar_pergunta
+from database import CONVENIOS
+
+# Tokens de nome que não identificam um médico
+_TITULOS = {"dr", "dra", "doutor", "doutora"}
+# Palavras que, na pergunta, precedem o nome de um médico
+_TITULOS_PERGUNTA = _TITULOS | {"medico", "medica"}
+SIMILARIDADE_MINIMA = 0.85
+
+_AGENDA = re.compile(r"\bagenda\b")
+_HOJE = re.compile(r"\bhoje\b")
+_ONTEM = re.compile(r"\bontem\b")
+_MES = re.compile(r"\b(mes|mensal)\b")
+# O mês do dashboard: "do mês", "deste mês", "mês atual"
+_MES_ATUAL = re.compile(r"\b(do|deste|neste|este|desse|nesse) mes\b|\bmes atual\b")
+_ATENDIMENTOS = re.compile(r"\b(consultas?|pacientes?|atendimentos?|horarios?)\b")
+_DASHBOARD = re.compile(r"\b(dashboard|painel|resumo|relatorio)\b")
+_FINANCEIRO = re.compile(r"\b(financeiro|faturamento|receitas?)\b")
+# Qualquer período além de hoje/ontem/mês atual: os relatórios prontos não atendem
+_OUTRO_PERIODO = re.compile(
+    r"\b(amanha|anteontem|semanas?|semanal|anos?|anual|trimestres?|semestres?|meses|periodo|"
+    r"passad[oa]s?|anterior(es)?|proxim[oa]s?|ultim[oa]s?|"
+    r"janeiro|fevereiro|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro|"
+    r"segunda|terca|quarta|quinta|sexta|sabado|domingo)\b|\d"
+)
+# Filtros e quebras que os relatórios prontos não aplicam (convênio, status, horário, "por ...")
+_FILTRO = re.compile(
+    r"\b(convenios?|" + "|".join(normalizar_pergunta(nome).split()[0] for nome, _, _ in CONVENIOS) + r"|"
+    r"status|agendad[oa]s?|realizad[oa]s?|cancelad[oa]s?|confirmad[oa]s?|pendentes?|pag[oa]s?|"
+    r"horas?|manha|tarde|noite|especialidades?|procedimentos?|diagnosticos?|formas?)\b|"
+    r"\bpor (?!favor\b)\w+"
+)
+# "paciente Fulano": a pergunta é sobre um paciente, não sobre a agenda de um médico
+_PACIENTE_NOMEADO = re.compile(r"\bpaciente (?!(de|do|da|dos|das|com|que|e|hoje|ontem)\b)\w{3,}")
+
+AGENDA_HOJE = "agenda_hoje"
+RESUMO_ONTEM = "resumo_ontem"
+DASHBOARD_FINANCEIRO = "dashboard_financeiro"
+
+
+def _tokens_nome(nome):
+    return [t for t in normalizar_pergunta(nome).split() if t not in _TITULOS and len(t) >= 3]
+
+
+def _nome_apos_titulo(trecho, tokens):
+    """Quantos tokens seguidos de ``trecho`` são partes do nome (tokens inteiros,
+    tolerando erros de digitação)."""
+    restantes = list(tokens)
+    n = 0
+    for palavra in trecho:
+        if len(palavra) < 3:
+            break
+        parecido = palavra if palavra in restantes else next(
+            iter(difflib.get_close_matches(palavra, restantes, n=1, cutoff=SIMILARIDADE_MINIMA)), None
+        )
+        if parecido is None:
+            break
+        restantes.remove(parecido)
+        n += 1
+    return n
+
+
+def identificar_medico(pergunta, medicos):
+    """Retorna (médico, partes do nome encontradas) para o médico citado na pergunta, ou None.
+
+    Só conta o nome escrito logo depois de um título ("Dr.", "Dra.", "doutor(a)",
+    "médico(a)"), parte por parte, tolerando erros de digitação; só há resultado
+    quando um único médico tem a maior pontuação.
+    """
+    palavras = normalizar_pergunta(pergunta).split()
+    trechos = [palavras[i + 1:i + 4] for i, p in enumerate(palavras) if p in _TITULOS_PERGUNTA]
+    if not trechos:
+        return None
+
+    pontuacao = {}
+    for medico in medicos:
+        tokens = _tokens_nome(medico)
+        pontos = max(_nome_apos_titulo(trecho, tokens) for trecho in trechos)
+        if pontos:
+            pontuacao[medico] = pontos
+
+    if not pontuacao:
+        return None
+    melhor = max(pontuacao.values())
+    candidatos = [m for m, p in pontuacao.items() if p == melhor]
+    return (candidatos[0], melhor) if len(candidatos) == 1 else None
+
+
+def classificar_intencao(pergunta, medicos):
+    """Reconhece pedidos atendidos pelos relatórios prontos.
+
+    Retorna (intenção, médico) — médico é None para o dashboard — ou None quando a
+    pergunta deve seguir para a geração de SQL.
+    """
+    texto = normalizar_pergunta(pergunta)
+    # Outros períodos, filtros e perguntas sobre um paciente ficam com a geração de SQL
+    if _OUTRO_PERIODO.search(texto) or _FILTRO.search(texto) or _PACIENTE_NOMEADO.search(texto):
+        return None
+    encontrado = identificar_medico(pergunta, medicos)
+
+    if encontrado is None:
+        # O dashboard é o financeiro do mês inteiro: hoje, ontem ou "mensal" não são ele
+        if _HOJE.search(texto) or _ONTEM.search(texto) or _MES.search(_MES_ATUAL.sub("", texto)):
+            return None
+        if _FINANCEIRO.search(texto) and (_DASHBOARD.search(texto) or _MES_ATUAL.search(texto)):
+            return DASHBOARD_FINANCEIRO, None
+        return None
+
+    medico, _ = encontrado
+    if _MES.search(texto):
+        return None
+    if _AGENDA.search(texto) and not _ONTEM.search(texto):
+        return AGENDA_HOJE, medico
+    if _HOJE.search(texto) and _ATENDIMENTOS.search(texto):
+        return AGENDA_HOJE, medico
+    if _ONTEM.search(texto):
+        return RESUMO_ONTEM, medico
+    return None
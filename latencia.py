@@ -0,0 +1,271 @@
+"""Tempo de cada etapa do atendimento de uma pergunta (spans).
+
+Cada pergunta vira um rastreio com um span por etapa (esquema, histórico, geração do
+SQL, execução, resposta, renderização). As durações entram numa janela por etapa,
+compartilhada por todas as sessões do processo, de onde saem p50/p95.
+
+Com LATENCIA_EXPORT, cada rastreio também é exportado no formato OTLP/JSON do
+OpenTelemetry: um caminho de arquivo recebe uma linha JSON por pergunta (o mesmo
+formato do file exporter do Collector); uma URL http(s) recebe um POST, como o
+endpoint /v1/traces de um Collector.
+
+Uso:
+    python latencia.py spans.jsonl    # p50/p95 por etapa a partir de um arquivo exportado
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Arquivo (.jsonl) ou URL de um Collector (ex.: http://localhost:4318/v1/traces); vazio não exporta
+LATENCIA_EXPORT = os.getenv("LATENCIA_EXPORT", "")
+LATENCIA_AMOSTRAS = int(os.getenv("LATENCIA_AMOSTRAS", "1000"))  # durações guardadas por etapa
+LATENCIA_SERVICO = "chat-hospitalar"
+
+ETAPAS = {
+    "schema": "Esquema",
+    "historico": "Histórico",
+    "geracao_sql": "Geração do SQL",
+    "execucao": "Execução",
+    "cache_sql": "Cache do SQL",
+    "resposta": "Resposta",
+    "renderizacao": "Renderização",
+}
+
+log = logging.getLogger("latencia")
+
+_lock = threading.Lock()
+_lock_arquivo = threading.Lock()
+_janelas = {}
+_exportador = None
+
+
+def rotulo(etapa):
+    """Nome de exibição de uma etapa ("total" é a pergunta inteira)."""
+    return "Total" if etapa == "total" else ETAPAS.get(etapa, etapa)
+
+
+class Rastreio:
+    """Spans de uma pergunta. ``etapa()`` mede um trecho; ``finalizar()`` registra e exporta."""
+
+    def __init__(self, nome="pergunta", **atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self.trace_id = secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.inicio_ns = time.time_ns()
+        self._relogio = time.perf_counter_ns()
+        self.fim_ns = None
+        self.erro = None
+        self.spans = []
+
+    @contextmanager
+    def etapa(self, nome, **atributos):
+        """Mede o bloco como um span; o dict retornado aceita atributos durante a execução."""
+        span = {"nome": nome, "atributos": dict(atributos), "erro": None}
+        inicio = time.perf_counter_ns()
+        span["inicio_ns"] = self.inicio_ns + (inicio - self._relogio)
+        try:
+            yield span["atributos"]
+        except BaseException as e:
+            span["erro"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["duracao_ns"] = time.perf_counter_ns() - inicio
+            self.spans.append(span)
+
+    def importar(self, etapas):
+        """Acrescenta etapas medidas em outro processo (as de etapas(), ex.: vindas da API do motor)."""
+        agora = time.time_ns()
+        for etapa in etapas:
+            duracao = int(etapa["ms"] * 1e6)
+            self.spans.append({
+                "nome": etapa["nome"], "atributos": dict(etapa.get("atributos") or {}),
+                "erro": etapa.get("erro"), "inicio_ns": agora - duracao, "duracao_ns": duracao,
+            })
+
+    def finalizar(self, erro=None):
+        """Fecha o rastreio, soma as durações por etapa na janela do processo e exporta.
+        Retorna as etapas como lista de dicts (nome, ms, atributos), para a tela."""
+        if self.fim_ns is not None:
+            return self.etapas()
+        self.fim_ns = self.inicio_ns + (time.perf_counter_ns() - self._relogio)
+        self.erro = erro
+        totais = {}
+        for span in self.spans:
+            totais[span["nome"]] = totais.get(span["nome"], 0) + span["duracao_ns"]
+        with _lock:
+            for nome, duracao in totais.items():
+                _janelas.setdefault(nome, deque(maxlen=LATENCIA_AMOSTRAS)).append(duracao / 1e6)
+            _janelas.setdefault("total", deque(maxlen=LATENCIA_AMOSTRAS)).append(
+                (self.fim_ns - self.inicio_ns) / 1e6
+            )
+        if LATENCIA_EXPORT:
+            _exportar(self.otlp())
+        return self.etapas()
+
+    def etapas(self):
+        """Uma linha por etapa, na ordem em que começaram (spans repetidos são somados)."""
+        etapas = {}
+        for s in self.spans:
+            etapa = etapas.setdefault(s["nome"], {"nome": s["nome"], "ms": 0.0, "atributos": {}, "erro": None})
+            etapa["ms"] += s["duracao_ns"] / 1e6
+            etapa["atributos"].update(s["atributos"])
+            etapa["erro"] = etapa["erro"] or s["erro"]
+        return list(etapas.values())
+
+    def otlp(self):
+        """O rastreio no formato OTLP/JSON (ExportTraceServiceRequest)."""
+        raiz = _span_otlp(self.trace_id, self.span_id, "", self.nome, self.inicio_ns,
+                          self.fim_ns or time.time_ns(), self.atributos, self.erro)
+        filhos = [
+            _span_otlp(self.trace_id, secrets.token_hex(8), self.span_id, s["nome"], s["inicio_ns"],
+                       s["inicio_ns"] + s["duracao_ns"], s["atributos"], s["erro"])
+            for s in self.spans
+        ]
+        return {"resourceSpans": [{
+            "resource": {"attributes": _atributos_otlp({"service.name": LATENCIA_SERVICO})},
+            "scopeSpans": [{"scope": {"name": "latencia"}, "spans": [raiz, *filhos]}],
+        }]}
+
+
+def _atributos_otlp(atributos):
+    convertidos = []
+    for chave, valor in atributos.items():
+        if valor is None:
+            continue
+        if isinstance(valor, bool):
+            tipado = {"boolValue": valor}
+        elif isinstance(valor, int):
+            tipado = {"intValue": str(valor)}
+        elif isinstance(valor, float):
+            tipado = {"doubleValue": valor}
+        else:
+            tipado = {"stringValue": str(valor)}
+        convertidos.append({"key": chave, "value": tipado})
+    return convertidos
+
+
+def _span_otlp(trace_id, span_id, pai, nome, inicio_ns, fim_ns, atributos, erro):
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": pai,
+        "name": nome,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(inicio_ns),
+        "endTimeUnixNano": str(fim_ns),
+        "attributes": _atributos_otlp(atributos),
+        "status": {"code": 2, "message": erro} if erro else {"code": 1},
+    }
+
+
+def _enviar(documento):
+    corpo = json.dumps(documento, ensure_ascii=False)
+    try:
+        if LATENCIA_EXPORT.startswith(("http://", "https://")):
+            pedido = urllib.request.Request(
+                LATENCIA_EXPORT, data=corpo.encode(), headers={"Content-Type": "application/json"}
+            )
+            urllib.request.urlopen(pedido, timeout=5).close()
+        else:
+            with _lock_arquivo, open(LATENCIA_EXPORT, "a", encoding="utf-8") as f:
+                f.write(corpo + "\n")
+    except Exception as e:
+        log.warning("falha ao exportar spans para %s: %s", LATENCIA_EXPORT, e)
+
+
+def _exportar(documento):
+    """Envia em segundo plano: o Collector lento ou fora do ar não atrasa a resposta."""
+    global _exportador
+    with _lock:
+        if _exportador is None:
+            _exportador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="latencia-export")
+    _exportador.submit(_enviar, documento)
+
+
+def _percentil(valores, p):
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def _resumo(janelas):
+    ordem = [e for e in ETAPAS if e in janelas] + sorted(e for e in janelas if e not in ETAPAS and e != "total")
+    if "total" in janelas:
+        ordem.append("total")
+    linhas = []
+    for nome in ordem:
+        valores = sorted(janelas[nome])
+        if not valores:
+            continue
+        linhas.append({
+            "etapa": nome,
+            "n": len(valores),
+            "p50_ms": _percentil(valores, 50),
+            "p95_ms": _percentil(valores, 95),
+            "max_ms": valores[-1],
+        })
+    return linhas
+
+
+def percentis():
+    """p50/p95 (ms) por etapa nas últimas LATENCIA_AMOSTRAS perguntas deste processo."""
+    with _lock:
+        janelas = {nome: list(valores) for nome, valores in _janelas.items()}
+    return _resumo(janelas)
+
+
+def limpar_percentis():
+    with _lock:
+        _janelas.clear()
+
+
+def percentis_arquivo(caminho):
+    """Como percentis(), a partir de um arquivo exportado (junta vários processos e dias)."""
+    janelas = {}
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                documento = json.loads(linha)
+            except ValueError:
+                continue
+            for recurso in documento.get("resourceSpans", []):
+                for escopo in recurso.get("scopeSpans", []):
+                    por_rastreio = {}
+                    for span in escopo.get("spans", []):
+                        ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                        nome = "total" if not span.get("parentSpanId") else span["name"]
+                        chave = (span["traceId"], nome)
+                        por_rastreio[chave] = por_rastreio.get(chave, 0) + ms
+                    for (_, nome), ms in por_rastreio.items():
+                        janelas.setdefault(nome, []).append(ms)
+    return _resumo(janelas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p95 por etapa a partir de spans exportados (OTLP/JSON).")
+    parser.add_argument("arquivo", nargs="?", default=LATENCIA_EXPORT or None,
+                        help="arquivo JSON Lines exportado (padrão: LATENCIA_EXPORT)")
+    args = parser.parse_args()
+    if not args.arquivo or args.arquivo.startswith(("http://", "https://")):
+        parser.error("informe o arquivo com os spans exportados")
+    linhas = percentis_arquivo(args.arquivo)
+    if not linhas:
+        print("Nenhum span encontrado.")
+        return
+    print(f"{'Etapa':<16}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}")
+    for linha in linhas:
+        print(f"{rotulo(linha['etapa']):<16}{linha['n']:>7}"
+              f"{linha['p50_ms']:>10.1f}{linha['p95_ms']:>10.1f}{linha['max_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Geração em lote dos relatórios PDF (todos os médicos ou uma seleção).
+
+As consultas são feitas uma única vez no processo principal: o financeiro e os
+diagnósticos do mês são comuns a todos os PDFs, e a agenda de hoje e o resumo de
+ontem vêm numa consulta só para todos os médicos, separada depois por médico. A
+renderização (reportlab, CPU pura) é distribuída num pool de processos.
+
+Uso:
+    python lote_pdf.py                              # todos os médicos -> relatorios_AAAA-MM-DD.zip
+    python lote_pdf.py "Dr. Roberto Mendes" --saida relatorios/
+    python lote_pdf.py --processos 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+
+from cache_relatorios import buscar_relatorio, chave_relatorio, salvar_relatorio
+from database import execute_query_raw, init_db
+from financeiro import snapshot_financeiro
+from relatorio_pdf import SQL_AGENDA, SQL_DIAGNOSTICOS, SQL_ONTEM, VERSAO_PDF, gerar_pdf_completo
+
+LOTE_PROCESSOS = int(os.getenv("LOTE_PROCESSOS", "0")) or os.cpu_count() or 1
+
+# Dados do mês, recebidos uma vez por processo do pool (initializer) em vez de a cada PDF
+_comuns = None
+
+
+def _iniciar_processo(comuns):
+    global _comuns
+    _comuns = comuns
+
+
+def _renderizar(tarefa):
+    medico, agenda, ontem = tarefa
+    return medico, gerar_pdf_completo(medico, dict(_comuns, agenda=agenda, ontem=ontem))
+
+
+def _separar_por_medico(df, medicos):
+    """{médico: linhas dele, sem a coluna "medico"}; médicos sem linhas recebem um DataFrame vazio."""
+    grupos = {nome: g.drop(columns="medico").reset_index(drop=True) for nome, g in df.groupby("medico", sort=False)}
+    vazio = df.drop(columns="medico").iloc[0:0]
+    return {m: grupos.get(m, vazio) for m in medicos}
+
+
+def coletar_dados_lote(medicos, hoje):
+    """Consultas do lote: retorna (dados comuns a todos os PDFs, {médico: (agenda, ontem)})."""
+    hoje_str = hoje.isoformat()
+    ontem_str = (hoje - timedelta(days=1)).isoformat()
+    primeiro_dia = hoje.replace(day=1).isoformat()
+    filtro = f"AND m.nome IN ({', '.join('?' * len(medicos))})"
+
+    tempos = {}
+    inicio = time.perf_counter()
+    agenda = execute_query_raw(SQL_AGENDA.format(filtro_medico=filtro), (hoje_str, *medicos), use_cache=False)
+    tempos["agenda"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    ontem = execute_query_raw(SQL_ONTEM.format(filtro_medico=filtro), (ontem_str, *medicos), use_cache=False)
+    tempos["ontem"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    financeiro = snapshot_financeiro(primeiro_dia, hoje_str)
+    tempos["financeiro"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    diagnosticos = execute_query_raw(SQL_DIAGNOSTICOS, (primeiro_dia, hoje_str))
+    tempos["diagnosticos"] = time.perf_counter() - inicio
+
+    comuns = {"hoje": hoje, "financeiro": financeiro, "diagnosticos": diagnosticos, "tempos": tempos}
+    agendas = _separar_por_medico(agenda, medicos)
+    ontens = _separar_por_medico(ontem, medicos)
+    return comuns, {m: (agendas[m], ontens[m]) for m in medicos}
+
+
+def gerar_lote(medicos=None, hoje=None, processos=None):
+    """Gera os PDFs de ``medicos`` (todos, se vazio), produzindo (médico, pdf, veio_do_cache).
+
+    PDFs já presentes no cache de relatórios são reaproveitados; os demais são
+    renderizados em até ``processos`` processos (padrão: LOTE_PROCESSOS) e gravados no cache.
+    """
+    hoje = hoje or date.today()
+    if not medicos:
+        medicos = execute_query_raw("SELECT nome FROM medicos ORDER BY nome")["nome"].tolist()
+    medicos = list(dict.fromkeys(medicos))
+
+    chaves = {m: chave_relatorio("pdf", m, hoje, VERSAO_PDF) for m in medicos}
+    pendentes = []
+    for medico in medicos:
+        pdf = buscar_relatorio(chaves[medico], "pdf")
+        if pdf is None:
+            pendentes.append(medico)
+        else:
+            yield medico, pdf, True
+    if not pendentes:
+        return
+
+    comuns, por_medico = coletar_dados_lote(pendentes, hoje)
+    tarefas = [(m, *por_medico[m]) for m in pendentes]
+    processos = max(1, min(processos or LOTE_PROCESSOS, len(tarefas)))
+
+    if processos == 1:
+        _iniciar_processo(comuns)
+        for medico, pdf in map(_renderizar, tarefas):
+            salvar_relatorio(chaves[medico], "pdf", pdf)
+            yield medico, pdf, False
+        return
+
+    # spawn: o app roda com threads (Streamlit, pool de conexões), e fork nesse estado não é seguro
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_iniciar_processo,
+        initargs=(comuns,),
+    ) as executor:
+        lote = max(1, len(tarefas) // (processos * 4))
+        for medico, pdf in executor.map(_renderizar, tarefas, chunksize=lote):
+            salvar_relatorio(chaves[medico], "pdf", pdf)
+            yield medico, pdf, False
+
+
+def nome_arquivo(medico, hoje, usados=None):
+    """relatorio_<medico>_<data>.pdf, só com ASCII; ``usados`` evita nomes repetidos."""
+    texto = unicodedata.normalize("NFKD", medico).encode("ascii", "ignore").decode()
+    base = f"relatorio_{re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_') or 'medico'}_{hoje.isoformat()}"
+    nome, n = f"{base}.pdf", 1
+    while usados is not None and nome in usados:
+        n += 1
+        nome = f"{base}_{n}.pdf"
+    if usados is not None:
+        usados.add(nome)
+    return nome
+
+
+def gerar_zip(medicos=None, hoje=None, processos=None, destino=None):
+    """Gera o lote num ZIP (``destino``: caminho ou arquivo; se omitido, retorna os bytes).
+
+    Retorna (bytes ou None, estatísticas) — estatísticas com "gerados" e "do_cache".
+    """
+    hoje = hoje or date.today()
+    saida = BytesIO() if destino is None else destino
+    stats = {"gerados": 0, "do_cache": 0}
+    usados = set()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as zf:
+        for medico, pdf, do_cache in gerar_lote(medicos, hoje, processos):
+            zf.writestr(nome_arquivo(medico, hoje, usados), pdf)
+            stats["do_cache" if do_cache else "gerados"] += 1
+    return (saida.getvalue() if destino is None else None), stats
+
+
+def gerar_diretorio(diretorio, medicos=None, hoje=None, processos=None):
+    """Grava um PDF por médico em ``diretorio``. Retorna as estatísticas, como gerar_zip."""
+    hoje = hoje or date.today()
+    os.makedirs(diretorio, exist_ok=True)
+    stats = {"gerados": 0, "do_cache": 0}
+    usados = set()
+    for medico, pdf, do_cache in gerar_lote(medicos, hoje, processos):
+        with open(os.path.join(diretorio, nome_arquivo(medico, hoje, usados)), "wb") as f:
+            f.write(pdf)
+        stats["do_cache" if do_cache else "gerados"] += 1
+    return stats
+
+
+def gerar_zip_isolado(medicos=None, hoje=None, processos=None):
+    """gerar_zip rodando em ``python -m lote_pdf``, para chamar de dentro do Streamlit.
+
+    O Streamlit instala o script do app como módulo __main__, e o spawn do
+    multiprocessing reexecutaria o app inteiro em cada processo do pool. Num processo
+    separado, o __main__ dos filhos é este módulo. Com um só processo, roda aqui mesmo.
+    """
+    hoje = hoje or date.today()
+    processos = processos or LOTE_PROCESSOS
+    if processos <= 1:
+        return gerar_zip(medicos, hoje, 1)
+
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [pasta, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = os.path.join(tmp, "lote.zip")
+        comando = [sys.executable, "-m", "lote_pdf", *(medicos or []), "--saida", destino,
+                   "--data", hoje.isoformat(), "--processos", str(processos), "--json"]
+        resultado = subprocess.run(comando, env=env, capture_output=True, text=True)
+        if resultado.returncode != 0:
+            linhas = resultado.stderr.strip().splitlines()
+            raise RuntimeError(linhas[-1] if linhas else f"lote_pdf terminou com código {resultado.returncode}")
+        with open(destino, "rb") as f:
+            return f.read(), json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os relatórios PDF de vários médicos de uma vez.")
+    parser.add_argument("medicos", nargs="*", help="nomes dos médicos (padrão: todos)")
+    parser.add_argument("--saida", help="arquivo .zip ou diretório (padrão: relatorios_<data>.zip)")
+    parser.add_argument("--processos", type=int, default=LOTE_PROCESSOS,
+                        help="processos de renderização (padrão: núcleos da máquina)")
+    parser.add_argument("--data", type=date.fromisoformat, help="data de referência AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--json", action="store_true", help="imprime só as estatísticas, em JSON")
+    args = parser.parse_args()
+
+    init_db()
+    hoje = args.data or date.today()
+    saida = args.saida or f"relatorios_{hoje.isoformat()}.zip"
+    inicio = time.perf_counter()
+    if saida.endswith(".zip"):
+        _, stats = gerar_zip(args.medicos, hoje, args.processos, destino=saida)
+    else:
+        stats = gerar_diretorio(saida, args.medicos, hoje, args.processos)
+    if args.json:
+        print(json.dumps(stats))
+        return
+    print(f"{stats['gerados'] + stats['do_cache']} relatórios em {saida} "
+          f"({stats['gerados']} gerados, {stats['do_cache']} do cache) em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Responde em lote um arquivo de perguntas pelo motor (motor.py), várias ao mesmo tempo.
+
+Cada pergunta segue o mesmo caminho do chat (SQL, consulta e resposta), sem histórico.
+Um laço asyncio mantém até --concorrencia perguntas em andamento; como o motor e o
+SQLite são síncronos, cada uma roda numa thread de um pool do mesmo tamanho, e o tempo
+total fica limitado pela concorrência, não pela soma das idas e voltas ao modelo.
+
+Entrada: .txt (uma pergunta por linha, # comenta), .csv ou .jsonl com "pergunta" e,
+opcionalmente, "id". {medico} ou {especialidade} numa pergunta a repete para cada
+médico / especialidade do banco.
+
+Saída: .jsonl (uma linha por pergunta, com as linhas do resultado) ou .csv (uma linha por
+pergunta; a tabela de cada resultado vai para <saida>_tabelas/<id>.csv).
+
+Uso:
+    python lote_perguntas.py perguntas.txt --saida respostas.jsonl --concorrencia 16
+    python lote_perguntas.py kpis.csv --saida kpis.csv --base-url http://localhost:8080/v1   # servidor stub
+    python lote_perguntas.py perguntas.txt --api http://localhost:8000                        # API do motor
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from itertools import product
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Antes dos módulos do projeto, que leem as variáveis de ambiente ao serem importados
+load_dotenv()
+
+import motor
+from database import execute_query_raw, init_db
+from latencia import Rastreio, percentis, rotulo
+
+PERGUNTAS_CONCORRENCIA = int(os.getenv("PERGUNTAS_CONCORRENCIA", "8"))
+
+# Marcadores que repetem a pergunta para cada valor do banco
+_MARCADORES = {
+    "medico": "SELECT nome FROM medicos ORDER BY nome",
+    "especialidade": "SELECT DISTINCT especialidade FROM medicos ORDER BY especialidade",
+}
+
+
+def ler_perguntas(caminho):
+    """Lista de {"id", "pergunta"} do arquivo (.txt, .csv ou .jsonl)."""
+    if caminho.endswith(".csv"):
+        registros = pd.read_csv(caminho, dtype=str).fillna("").to_dict("records")
+    elif caminho.endswith(".jsonl"):
+        with open(caminho, encoding="utf-8") as f:
+            registros = [json.loads(linha) for linha in f if linha.strip()]
+    else:
+        with open(caminho, encoding="utf-8") as f:
+            registros = [{"pergunta": linha.strip()} for linha in f if linha.strip() and not linha.lstrip().startswith("#")]
+    perguntas = []
+    for n, registro in enumerate(registros, 1):
+        pergunta = str(registro.get("pergunta") or "").strip()
+        if pergunta:
+            perguntas.append({"id": str(registro.get("id") or n), "pergunta": pergunta})
+    return perguntas
+
+
+def expandir(perguntas):
+    """Repete as perguntas com {medico}/{especialidade} para cada valor (id ganha o sufixo -1, -2...)."""
+    valores = {}
+    expandidas = []
+    for item in perguntas:
+        usados = [m for m in _MARCADORES if "{" + m + "}" in item["pergunta"]]
+        if not usados:
+            expandidas.append(item)
+            continue
+        for marcador in usados:
+            if marcador not in valores:
+                valores[marcador] = execute_query_raw(_MARCADORES[marcador]).iloc[:, 0].tolist()
+        for k, combinacao in enumerate(product(*(valores[m] for m in usados)), 1):
+            pergunta = item["pergunta"]
+            for marcador, valor in zip(usados, combinacao):
+                pergunta = pergunta.replace("{" + marcador + "}", str(valor))
+            expandidas.append({"id": f"{item['id']}-{k}", "pergunta": pergunta})
+    return expandidas
+
+
+def responder_local(cliente, pergunta):
+    """motor.responder() com as etapas medidas (entram no p50/p95 do resumo)."""
+    rastreio = Rastreio()
+    try:
+        resultado = motor.responder(cliente, pergunta, rastreio=rastreio)
+    except Exception as e:
+        rastreio.finalizar(f"{type(e).__name__}: {e}")
+        raise
+    resultado["etapas"] = rastreio.finalizar()
+    return resultado
+
+
+def responder_remoto(url, pergunta):
+    """A mesma pergunta atendida pela API do motor (api.py)."""
+    resultado = {"pergunta": pergunta}
+    for evento in motor.eventos_remotos(pergunta, url=url):
+        if evento["tipo"] != "token":
+            resultado.update({k: v for k, v in evento.items() if k != "tipo"})
+    return resultado
+
+
+async def executar(perguntas, responder, concorrencia=PERGUNTAS_CONCORRENCIA, ao_concluir=None):
+    """Roda ``responder(pergunta)`` (síncrona) para cada pergunta, com até ``concorrencia``
+    em andamento. Erros não interrompem o lote: ficam em "erro"/"mensagem" do resultado.
+    Retorna os resultados na ordem de entrada, cada um com "id" e "ms"."""
+    loop = asyncio.get_running_loop()
+    limite = asyncio.Semaphore(concorrencia)
+
+    with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="lote-perguntas") as executor:
+        async def uma(item):
+            async with limite:
+                inicio = time.perf_counter()
+                try:
+                    resultado = await loop.run_in_executor(executor, responder, item["pergunta"])
+                    resultado.update(erro=None, mensagem=None)
+                except Exception as e:
+                    erro = motor.erro_json(e)
+                    resultado = {"pergunta": item["pergunta"], "erro": erro["erro"], "mensagem": erro["mensagem"]}
+                resultado.update(id=item["id"], ms=round((time.perf_counter() - inicio) * 1000, 1))
+            if ao_concluir is not None:
+                ao_concluir(resultado)
+            return resultado
+
+        return await asyncio.gather(*(uma(item) for item in perguntas))
+
+
+_CAMPOS = ["id", "pergunta", "resposta", "sql", "origem", "do_cache", "truncado", "ms", "erro", "mensagem"]
+
+
+def gravar_jsonl(resultados, caminho):
+    with open(caminho, "w", encoding="utf-8") as f:
+        for resultado in resultados:
+            linha = motor.evento_json(resultado)
+            f.write(json.dumps({**{c: linha.get(c) for c in _CAMPOS}, **linha}, ensure_ascii=False, default=str) + "\n")
+
+
+def gravar_csv(resultados, caminho):
+    """Resumo em ``caminho`` e a tabela de cada resultado em <saida>_tabelas/<id>.csv."""
+    pasta = os.path.splitext(caminho)[0] + "_tabelas"
+    linhas = []
+    for resultado in resultados:
+        linha = {c: resultado.get(c) for c in _CAMPOS}
+        df = resultado.get("dataframe")
+        linha["linhas"] = None if df is None else len(df)
+        linha["tabela"] = None
+        if df is not None:
+            os.makedirs(pasta, exist_ok=True)
+            linha["tabela"] = os.path.join(pasta, re.sub(r"[^\w.-]+", "_", resultado["id"]) + ".csv")
+            df.to_csv(linha["tabela"], index=False)
+        linhas.append(linha)
+    pd.DataFrame(linhas, columns=[*_CAMPOS, "linhas", "tabela"]).to_csv(caminho, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde em lote um arquivo de perguntas, várias ao mesmo tempo.")
+    parser.add_argument("arquivo", help="perguntas: .txt (uma por linha), .csv ou .jsonl com \"pergunta\"")
+    parser.add_argument("--saida", help="arquivo .jsonl ou .csv (padrão: respostas_<data>.jsonl)")
+    parser.add_argument("--concorrencia", type=int, default=PERGUNTAS_CONCORRENCIA,
+                        help="perguntas em andamento ao mesmo tempo (padrão: PERGUNTAS_CONCORRENCIA)")
+    parser.add_argument("--base-url", help="endpoint compatível com a API da OpenAI (ex.: servidor stub local)")
+    parser.add_argument("--api", help="URL da API do motor (api.py); sem ela, o motor roda neste processo")
+    parser.add_argument("--quieto", action="store_true", help="não mostra o progresso")
+    args = parser.parse_args()
+    if args.concorrencia < 1:
+        parser.error("--concorrencia deve ser pelo menos 1")
+
+    init_db()
+    perguntas = expandir(ler_perguntas(args.arquivo))
+    saida = args.saida or f"respostas_{date.today().isoformat()}.jsonl"
+    if args.api:
+        def responder(pergunta):
+            return responder_remoto(args.api, pergunta)
+    else:
+        from openai import OpenAI
+
+        # Um servidor stub não confere a chave, mas o cliente exige uma
+        chave = os.getenv("OPENAI_API_KEY") or ("stub" if args.base_url else None)
+        cliente = OpenAI(api_key=chave, base_url=args.base_url)
+
+        def responder(pergunta):
+            return responder_local(cliente, pergunta)
+
+    feitas = 0
+
+    def progresso(resultado):
+        nonlocal feitas
+        feitas += 1
+        if not args.quieto:
+            situacao = f"ERRO {resultado['erro']}" if resultado["erro"] else resultado.get("origem", "")
+            print(f"[{feitas}/{len(perguntas)}] {resultado['ms']:>8.0f} ms  {situacao:<14} {resultado['pergunta'][:70]}",
+                  file=sys.stderr)
+
+    inicio = time.perf_counter()
+    resultados = asyncio.run(executar(perguntas, responder, args.concorrencia, progresso))
+    duracao = time.perf_counter() - inicio
+    (gravar_csv if saida.endswith(".csv") else gravar_jsonl)(resultados, saida)
+
+    erros = sum(1 for r in resultados if r["erro"])
+    print(f"{len(resultados)} perguntas em {duracao:.1f}s ({len(resultados) / duracao if duracao else 0:.1f}/s, "
+          f"concorrência {args.concorrencia}), {erros} com erro -> {saida}")
+    for linha in percentis():
+        print(f"  {rotulo(linha['etapa']):<16} p50 {linha['p50_ms']:>8.1f} ms   p95 {linha['p95_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Motor das perguntas em linguagem natural, independente do Streamlit.
+
+Histórico -> esquema -> SQL (cache ou modelo) -> validação -> execução -> resposta
+(formatada localmente ou redigida pelo modelo). ``eventos()`` entrega cada passo
+assim que fica pronto, para quem exibe a resposta enquanto ela é gerada (o app e a
+API de api.py); ``responder()`` devolve tudo de uma vez. Com MOTOR_URL, o app usa
+``eventos_remotos()``, que faz o mesmo pedindo à API em outro processo ou máquina.
+"""
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache import buscar_sql, salvar_sql
+from database import QueryTimeout, execute_query, get_schema
+from indices import analisar_consulta
+from latencia import Rastreio
+from resultado import serializar_resultado
+from tabelas import formatar_brl, formatar_data_br
+
+MODELO = "gpt-4o-mini"
+HISTORICO_MENSAGENS = 10  # mensagens anteriores enviadas como contexto
+
+# Resultados simples (vazio, valor único, tabelas pequenas) são formatados localmente,
+# sem a segunda chamada ao modelo (RESPOSTA_LOCAL=0 desliga)
+RESPOSTA_LOCAL = os.getenv("RESPOSTA_LOCAL", "1") != "0"
+RESPOSTA_LOCAL_MAX_LINHAS = 10
+RESPOSTA_LOCAL_MAX_COLUNAS = 4
+
+# API do motor (api.py) usada pelo app no lugar do motor local; vazio = motor no próprio processo
+MOTOR_URL = os.getenv("MOTOR_URL", "").rstrip("/")
+MOTOR_TIMEOUT = 120  # segundos sem receber nada da API
+
+PALAVRAS_PROIBIDAS = ("INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "TRUNCATE", "CREATE", "REPLACE")
+
+
+class ConsultaBloqueada(Exception):
+    """O SQL gerado tentaria modificar o banco de dados."""
+
+
+SISTEMA_SQL = """Você é um assistente especializado em converter perguntas em consultas SQL para um banco de dados hospitalar SQLite.
+
+ESQUEMA DO BANCO:
+{schema}
+
+REGRAS OBRIGATÓRIAS:
+1. Gere APENAS consultas SELECT. NUNCA gere INSERT, UPDATE, DELETE, DROP, ALTER ou qualquer comando que modifique dados.
+2. Retorne APENAS o código SQL puro, sem markdown, sem explicação, sem comentários.
+3. Use JOINs quando a pergunta envolver dados de múltiplas tabelas (ex: nome do paciente + dados da consulta).
+4. Para buscas por nome, use LIKE com '%' para busca parcial (ex: WHERE nome LIKE '%Ana%'). Use COLLATE NOCASE para ignorar maiúsculas/minúsculas.
+5. Datas estão no formato 'YYYY-MM-DD'. Use date('now') para a data de hoje. Use strftime() para extrair mês/ano.
+6. Use aliases claros para colunas de JOINs (ex: pacientes.nome AS paciente, medicos.nome AS medico).
+7. Limite resultados a 50 linhas com LIMIT 50, a menos que a pergunta peça contagem ou agregação.
+8. Para perguntas vagas ou impossíveis de responder com o esquema, retorne: SELECT 'Pergunta não pode ser respondida com os dados disponíveis' AS resposta
+9. A coluna hora_consulta está no formato 'HH:MM' (ex: '08:00', '14:30').
+
+VALORES CONHECIDOS:
+- status de consultas: 'agendada', 'realizada'
+- status de contas: 'pendente', 'pago', 'parcial'
+- formas de pagamento: 'cartao_credito', 'cartao_debito', 'pix', 'dinheiro', 'convenio'
+- categorias de procedimentos: 'consulta', 'exame', 'cirurgia', 'procedimento'
+- tipos de convênio: 'particular', 'empresarial', 'individual'
+- nomes de convênios: Unimed, Amil, SulAmérica, Bradesco Saúde, Hapvida, Particular
+- especialidades: Cardiologia, Dermatologia, Ortopedia, Pediatria, Neurologia, Ginecologia, Oftalmologia, Psiquiatria, Urologia, Endocrinologia, Clínica Geral, Pneumologia, Gastroenterologia, Oncologia, Cirurgia Geral"""
+
+
+SISTEMA_RESPOSTA = """Você é um assistente de um sistema hospitalar. Sua função é transformar resultados de consultas SQL em respostas naturais e claras em português brasileiro.
+
+REGRAS:
+1. Seja direto e objetivo. Não mencione SQL, banco de dados ou termos técnicos.
+2. Quando houver múltiplos resultados, organize em lista ou formato estruturado.
+3. Formate datas para o padrão brasileiro (DD/MM/AAAA).
+4. Se o resultado for "Nenhum resultado encontrado", diga de forma amigável (ex: "Não encontrei registros para essa busca.").
+5. Considere o histórico da conversa para entender referências como "ele", "ela", "o mesmo".
+6. Não invente dados que não estejam no resultado. Responda apenas com base no que foi retornado.
+7. Se o resultado estiver marcado como parcial, avise que a lista está incompleta e não apresente contagens ou somas dele como totais.
+8. Quando linhas forem omitidas, use o resumo que vem antes da tabela (total de linhas, somas, mínimos e máximos) para falar do conjunto inteiro."""
+
+
+_COLUNA_MOEDA = re.compile(r"valor|receita|preco|preço|faturamento|faturado|pago|pendente|ticket|custo|desconto_total")
+_COLUNA_PERCENTUAL = re.compile(r"percentual|pct|taxa")
+# Códigos e anos: número inteiro sem separador de milhar (2026, não 2.026)
+_COLUNA_CODIGO = re.compile(r"^(id|ano)$|_id$")
+_DATA_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _formatar_numero_br(valor, casas=0):
+    """Formata número no padrão brasileiro: 1.234 ou 1.234,56"""
+    return f"{valor:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _formatar_valor(coluna, valor):
+    """Formata um valor de resultado conforme o nome da coluna e o tipo."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return "-"
+    nome = coluna.lower()
+    if isinstance(valor, str):
+        return formatar_data_br(valor) if _DATA_ISO.match(valor) else valor
+    if isinstance(valor, (bool, np.bool_)):
+        return "Sim" if valor else "Não"
+    if isinstance(valor, (int, float, np.number)):
+        if _COLUNA_CODIGO.search(nome) and float(valor).is_integer():
+            return str(int(valor))
+        if _COLUNA_PERCENTUAL.search(nome):
+            return f"{_formatar_numero_br(float(valor), 1)}%"
+        # Dinheiro é REAL no banco: inteiros (contagens como qtd_pagos) nunca viram R$
+        if isinstance(valor, (float, np.floating)) and (
+            _COLUNA_MOEDA.search(nome) or re.search(r"total|soma", nome)
+        ):
+            return formatar_brl(float(valor))
+        if isinstance(valor, (int, np.integer)) or float(valor).is_integer():
+            return _formatar_numero_br(float(valor))
+        return _formatar_numero_br(float(valor), 2)
+    return str(valor)
+
+
+def _rotulo_coluna(coluna):
+    """total_consultas -> Total consultas"""
+    texto = str(coluna).replace("_", " ").strip()
+    return texto[:1].upper() + texto[1:]
+
+
+def resposta_local(df):
+    """Monta a resposta sem o modelo quando o resultado é simples; senão retorna None.
+
+    Cobre: nenhum resultado, valor único, uma linha, uma coluna curta e tabelas
+    pequenas (até RESPOSTA_LOCAL_MAX_LINHAS x RESPOSTA_LOCAL_MAX_COLUNAS).
+    """
+    if df.empty:
+        return "Não encontrei registros para essa busca."
+    n_linhas, n_colunas = df.shape
+    if n_linhas > RESPOSTA_LOCAL_MAX_LINHAS or n_colunas > RESPOSTA_LOCAL_MAX_COLUNAS:
+        return None
+
+    colunas = list(df.columns)
+    linhas = [
+        [_formatar_valor(col, valor) for col, valor in zip(colunas, registro)]
+        for registro in df.itertuples(index=False, name=None)
+    ]
+
+    if n_linhas == 1 and n_colunas == 1:
+        # Resposta padrão do prompt de SQL para perguntas fora do escopo
+        if colunas[0] == "resposta":
+            return linhas[0][0]
+        return f"**{_rotulo_coluna(colunas[0])}:** {linhas[0][0]}"
+    if n_linhas == 1:
+        return "\n".join(f"- **{_rotulo_coluna(col)}:** {v}" for col, v in zip(colunas, linhas[0]))
+    if n_colunas == 1:
+        return f"**{_rotulo_coluna(colunas[0])}:**\n\n" + "\n".join(f"- {linha[0]}" for linha in linhas)
+
+    tabela = "| " + " | ".join(_rotulo_coluna(c) for c in colunas) + " |\n"
+    tabela += "|" + "|".join("---" for _ in colunas) + "|\n"
+    tabela += "\n".join("| " + " | ".join(linha) + " |" for linha in linhas)
+    return tabela
+
+
+@lru_cache(maxsize=4)
+def sistema_sql(schema):
+    """Prompt de sistema da geração de SQL, montado uma vez por esquema.
+
+    A chave é o próprio DDL (de get_schema()): bancos diferentes na mesma versão do
+    esquema não compartilham o prompt.
+    """
+    return SISTEMA_SQL.format(schema=schema)
+
+
+def montar_contexto(historico):
+    """Bloco de histórico do prompt com as últimas HISTORICO_MENSAGENS mensagens ({"role", "content"})."""
+    linhas = ""
+    for msg in list(historico)[-HISTORICO_MENSAGENS:]:
+        if msg["role"] == "user":
+            linhas += f"Usuário: {msg['content']}\n"
+        elif msg["role"] == "assistant":
+            linhas += f"Assistente: {msg['content']}\n"
+    if not linhas:
+        return ""
+    return f"""Histórico da conversa (use como contexto para entender referências como "ele", "ela", "isso", "o mesmo", etc.):
+{linhas}
+"""
+
+
+def limpar_sql(texto):
+    """Remove a cerca de markdown que o modelo às vezes coloca em volta do SQL."""
+    return texto.strip().removeprefix("```sql").removeprefix("```").removesuffix("```").strip()
+
+
+def validar_sql(sql):
+    """Validação de segurança: levanta ConsultaBloqueada para comandos destrutivos."""
+    if any(sql.upper().strip().startswith(p) for p in PALAVRAS_PROIBIDAS):
+        raise ConsultaBloqueada("Desculpe, só posso realizar consultas de leitura no banco de dados.")
+
+
+def mensagens_resposta(pergunta, contexto, df):
+    """Mensagens da chamada que redige a resposta a partir do resultado."""
+    resultado = serializar_resultado(df)
+    if df.attrs.get("truncado", False):
+        resultado += f"\n(Resultado parcial: apenas as primeiras {len(df)} linhas foram retornadas.)"
+    return [
+        {"role": "system", "content": SISTEMA_RESPOSTA},
+        {"role": "user", "content": f"""{contexto}Pergunta do usuário: {pergunta}
+Resultado da consulta: {resultado}"""},
+    ]
+
+
+def _tokens_resposta(stream):
+    """Extrai os pedaços de texto de uma completion em streaming."""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def eventos(cliente, pergunta, historico=(), stream=False, rastreio=None):
+    """Atende a pergunta produzindo um dict por passo, na ordem:
+
+    - ``{"tipo": "sql", "sql", "do_cache"}``
+    - ``{"tipo": "dados", "dataframe", "truncado"}``
+    - ``{"tipo": "token", "texto"}``, vários, só com ``stream`` e resposta do modelo
+    - ``{"tipo": "resposta", "resposta", "origem"}``, origem "local" ou "llm"
+
+    Erros saem como exceção (QueryTimeout, ConsultaBloqueada, erros do cliente).
+    Cada etapa vira um span em ``rastreio``; fechá-lo com finalizar() fica com quem chamou.
+    """
+    rastreio = rastreio or Rastreio()
+    with rastreio.etapa("historico"):
+        contexto = montar_contexto(historico)
+
+    with rastreio.etapa("schema"):
+        schema = get_schema()
+    with rastreio.etapa("geracao_sql") as span:
+        sql = buscar_sql(pergunta, contexto, schema)
+        do_cache = sql is not None
+        span["cache"] = do_cache
+        if not do_cache:
+            resposta_sql = cliente.chat.completions.create(
+                model=MODELO,
+                messages=[
+                    {"role": "system", "content": sistema_sql(schema)},
+                    {"role": "user", "content": f"{contexto}Pergunta atual: {pergunta}"},
+                ],
+            )
+            sql = limpar_sql(resposta_sql.choices[0].message.content)
+    validar_sql(sql)
+    yield {"tipo": "sql", "sql": sql, "do_cache": do_cache}
+
+    with rastreio.etapa("execucao") as span:
+        df = execute_query(sql)
+        span["linhas"] = len(df)
+        # Varreduras completas no plano vão para o log (e viram índice com INDEX_ADVISOR=auto)
+        analisar_consulta(sql)
+    if not do_cache:
+        with rastreio.etapa("cache_sql"):
+            salvar_sql(pergunta, contexto, schema, sql)
+    # O resultado foi cortado em QUERY_MAX_ROWS linhas
+    truncado = bool(df.attrs.get("truncado", False))
+    yield {"tipo": "dados", "dataframe": df, "truncado": truncado}
+
+    resposta = resposta_local(df) if RESPOSTA_LOCAL and not truncado else None
+    if resposta is not None:
+        yield {"tipo": "resposta", "resposta": resposta, "origem": "local"}
+        return
+
+    with rastreio.etapa("resposta") as span:
+        if stream:
+            # Com streaming, o consumidor exibe cada pedaço enquanto ele chega: esse tempo fica nesta etapa
+            pedacos = []
+            inicio = time.perf_counter()
+            for pedaco in _tokens_resposta(cliente.chat.completions.create(
+                model=MODELO, messages=mensagens_resposta(pergunta, contexto, df), stream=True,
+            )):
+                if not pedacos:
+                    span["primeiro_token_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+                pedacos.append(pedaco)
+                yield {"tipo": "token", "texto": pedaco}
+            resposta = "".join(pedacos).strip()
+        else:
+            resposta_nl = cliente.chat.completions.create(
+                model=MODELO, messages=mensagens_resposta(pergunta, contexto, df),
+            )
+            resposta = resposta_nl.choices[0].message.content.strip()
+    yield {"tipo": "resposta", "resposta": resposta, "origem": "llm"}
+
+
+def responder(cliente, pergunta, historico=(), rastreio=None):
+    """eventos() consumido de uma vez: dict com sql, do_cache, dataframe, truncado, resposta e origem."""
+    resultado = {"pergunta": pergunta}
+    for evento in eventos(cliente, pergunta, historico, rastreio=rastreio):
+        resultado.update({k: v for k, v in evento.items() if k != "tipo"})
+    return resultado
+
+
+# --- Transporte (JSON) ---
+
+_ERROS = {"timeout": QueryTimeout, "bloqueada": ConsultaBloqueada}
+
+
+def evento_json(evento):
+    """Evento pronto para json.dumps: o DataFrame vira colunas + linhas."""
+    if "dataframe" not in evento:
+        return evento
+    tabela = json.loads(evento["dataframe"].to_json(orient="split", index=False, date_format="iso"))
+    convertido = {k: v for k, v in evento.items() if k != "dataframe"}
+    convertido.update(colunas=tabela["columns"], linhas=tabela["data"])
+    return convertido
+
+
+def evento_de_json(evento):
+    """Inverso de evento_json; um evento de erro vira a exceção correspondente."""
+    if evento.get("tipo") == "erro":
+        raise _ERROS.get(evento.get("erro"), RuntimeError)(evento.get("mensagem", "erro no motor"))
+    if "linhas" not in evento:
+        return evento
+    df = pd.DataFrame(evento["linhas"], columns=evento["colunas"])
+    df.attrs["truncado"] = evento.get("truncado", False)
+    convertido = {k: v for k, v in evento.items() if k not in ("colunas", "linhas")}
+    convertido["dataframe"] = df
+    return convertido
+
+
+def erro_json(e):
+    """Evento de erro para uma exceção do motor: "timeout", "bloqueada" ou "falha"."""
+    codigo = next((nome for nome, classe in _ERROS.items() if isinstance(e, classe)), "falha")
+    return {"tipo": "erro", "erro": codigo, "mensagem": str(e)}
+
+
+def eventos_remotos(pergunta, historico=(), url=None):
+    """Como eventos(stream=True), mas atendido pela API do motor (POST /perguntas).
+
+    Depois da resposta vem ``{"tipo": "etapas", "etapas"}``, com os tempos medidos na API.
+    """
+    corpo = json.dumps({
+        "pergunta": pergunta,
+        "historico": [{"role": m["role"], "content": m["content"]} for m in list(historico)[-HISTORICO_MENSAGENS:]],
+        "stream": True,
+    }).encode()
+    pedido = urllib.request.Request(
+        f"{url or MOTOR_URL}/perguntas", data=corpo, headers={"Content-Type": "application/json"}
+    )
+    try:
+        resposta = urllib.request.urlopen(pedido, timeout=MOTOR_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        try:
+            evento = json.loads(e.read())
+        except ValueError:
+            evento = {"tipo": "erro", "erro": "falha", "mensagem": f"API do motor respondeu {e.code}"}
+        evento_de_json(dict(evento, tipo="erro"))
+        raise
+    with resposta:
+        for linha in resposta:
+            if linha.strip():
+                yield evento_de_json(json.loads(linha))
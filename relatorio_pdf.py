@@ -0,0 +1,486 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from database import POOL_SIZE, execute_query_raw
+from financeiro import snapshot_financeiro
+from tabelas import (
+    coluna_brl, coluna_inteiro, coluna_percentual, coluna_texto, formatar_brl, linhas_tabela,
+)
+
+# Versão do layout do PDF, parte da chave do cache de relatórios:
+# incremente ao mudar o conteúdo gerado por gerar_pdf_completo
+VERSAO_PDF = 1
+
+# Consultas por médico do PDF. ``filtro_medico`` é "AND m.nome = ?" para um médico
+# ou vazio para todos de uma vez (geração em lote); a coluna "medico" permite separar.
+SQL_AGENDA = """
+    SELECT m.nome AS medico, c.hora_consulta, p.nome AS paciente, p.telefone, c.status, c.diagnostico
+    FROM consultas c
+    JOIN pacientes p ON c.paciente_id = p.id
+    JOIN medicos m ON c.medico_id = m.id
+    WHERE c.data_consulta = ? {filtro_medico}
+    ORDER BY m.nome, c.hora_consulta
+"""
+
+SQL_ONTEM = """
+    SELECT m.nome AS medico, c.hora_consulta, p.nome AS paciente, c.diagnostico,
+           COALESCE(pr.nome, '-') AS procedimento,
+           COALESCE(co.valor_total, 0) AS valor_total,
+           COALESCE(co.valor_pago, 0) AS valor_pago,
+           COALESCE(co.status, '-') AS status_conta
+    FROM consultas c
+    JOIN pacientes p ON c.paciente_id = p.id
+    JOIN medicos m ON c.medico_id = m.id
+    LEFT JOIN contas co ON co.consulta_id = c.id
+    LEFT JOIN procedimentos pr ON co.procedimento_id = pr.id
+    WHERE c.data_consulta = ? {filtro_medico}
+    ORDER BY m.nome, c.hora_consulta
+"""
+
+# Seções do mês, iguais para todos os médicos
+SQL_DIAGNOSTICOS = """
+    SELECT c.diagnostico, COUNT(*) AS qtd
+    FROM consultas c
+    WHERE c.data_consulta BETWEEN ? AND ? AND c.diagnostico IS NOT NULL
+    GROUP BY c.diagnostico
+    ORDER BY qtd DESC
+    LIMIT 8
+"""
+
+
+def coletar_dados_pdf(medico_nome, hoje=None):
+    """Executa em paralelo as consultas do PDF e retorna os dados de cada seção.
+
+    O resultado inclui "hoje" (data de referência) e "tempos" (segundos gastos em
+    cada consulta), então o tempo total fica próximo ao da consulta mais lenta.
+    """
+    hoje = hoje or date.today()
+    hoje_str = hoje.isoformat()
+    ontem_str = (hoje - timedelta(days=1)).isoformat()
+    primeiro_dia = hoje.replace(day=1).isoformat()
+
+    filtro = "AND m.nome = ?"
+    # Seção -> (função, argumentos); o financeiro do mês é um único snapshot
+    tarefas = {
+        "agenda": (execute_query_raw, (SQL_AGENDA.format(filtro_medico=filtro), (hoje_str, medico_nome))),
+        "ontem": (execute_query_raw, (SQL_ONTEM.format(filtro_medico=filtro), (ontem_str, medico_nome))),
+        "financeiro": (snapshot_financeiro, (primeiro_dia, hoje_str)),
+        "diagnosticos": (execute_query_raw, (SQL_DIAGNOSTICOS, (primeiro_dia, hoje_str))),
+    }
+
+    def _executar(secao):
+        funcao, args = tarefas[secao]
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        return secao, resultado, time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=min(len(tarefas), POOL_SIZE)) as executor:
+        resultados = list(executor.map(_executar, tarefas))
+
+    dados = {secao: resultado for secao, resultado, _ in resultados}
+    dados["hoje"] = hoje
+    dados["tempos"] = {secao: tempo for secao, _, tempo in resultados}
+    return dados
+
+
+def gerar_pdf_completo(medico_nome, dados=None):
+    """Gera PDF A4 retrato com agenda de hoje, resumo de ontem e financeiro do mês.
+
+    ``dados`` é o retorno de coletar_dados_pdf; se omitido, as consultas são feitas aqui.
+    """
+    from io import BytesIO
+    import datetime as dt
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        SimpleDocTemplate, Table, TableStyle,
+        Paragraph, Spacer, HRFlowable,
+    )
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
+    if dados is None:
+        dados = coletar_dados_pdf(medico_nome)
+
+    hoje = dados["hoje"]
+    ontem = hoje - dt.timedelta(days=1)
+    hoje_str = hoje.isoformat()
+    ontem_str = ontem.isoformat()
+    hoje_br = hoje.strftime("%d/%m/%Y")
+    ontem_br = ontem.strftime("%d/%m/%Y")
+    primeiro_dia = hoje.replace(day=1).isoformat()
+
+    import locale
+    try:
+        locale.setlocale(locale.LC_TIME, "pt_BR.UTF-8")
+    except Exception:
+        pass
+    try:
+        mes_nome = hoje.strftime("%B/%Y")
+    except Exception:
+        mes_nome = hoje.strftime("%m/%Y")
+
+    buffer = BytesIO()
+    W_PAGE, H_PAGE = A4
+    MARGIN = 15 * mm
+    W = W_PAGE - 2 * MARGIN
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=MARGIN,
+        leftMargin=MARGIN,
+        topMargin=18 * mm,
+        bottomMargin=18 * mm,
+    )
+
+    s = getSampleStyleSheet()
+
+    def _ps(name, **kwargs):
+        base = kwargs.pop("parent", s["Normal"])
+        return ParagraphStyle(name, parent=base, **kwargs)
+
+    sT = _ps("sT", parent=s["Normal"], fontSize=18, fontName="Helvetica-Bold",
+              textColor=colors.HexColor("#1a1a2e"), alignment=TA_CENTER, spaceAfter=2)
+    sSub = _ps("sSub", fontSize=9, textColor=colors.HexColor("#666666"),
+                alignment=TA_CENTER, spaceAfter=10)
+    sSec = _ps("sSec", parent=s["Normal"], fontSize=12, fontName="Helvetica-Bold",
+               textColor=colors.white, spaceBefore=12, spaceAfter=6)
+    sMed = _ps("sMed", fontSize=9, textColor=colors.HexColor("#444444"), spaceAfter=6)
+    sNorm = _ps("sNorm", fontSize=8, textColor=colors.HexColor("#333333"))
+    sKL = _ps("sKL", fontSize=7, textColor=colors.HexColor("#666666"), alignment=TA_CENTER)
+    sKV = _ps("sKV", fontSize=15, fontName="Helvetica-Bold",
+               textColor=colors.HexColor("#1a1a2e"), alignment=TA_CENTER)
+    sKVg = _ps("sKVg", fontSize=15, fontName="Helvetica-Bold",
+                textColor=colors.HexColor("#2e7d32"), alignment=TA_CENTER)
+    sKVo = _ps("sKVo", fontSize=15, fontName="Helvetica-Bold",
+                textColor=colors.HexColor("#e65100"), alignment=TA_CENTER)
+    sH3 = _ps("sH3", parent=s["Normal"], fontSize=10, fontName="Helvetica-Bold",
+               textColor=colors.HexColor("#1a1a2e"), spaceBefore=6, spaceAfter=4)
+    sFoot = _ps("sFoot", fontSize=7, textColor=colors.HexColor("#999999"), alignment=TA_CENTER)
+
+    COR_AZUL = colors.HexColor("#1a1a2e")
+    COR_VERDE = colors.HexColor("#2e7d32")
+    COR_AZUL2 = colors.HexColor("#36A2EB")
+    COR_VERDE2 = colors.HexColor("#4CAF50")
+    COR_ROSA = colors.HexColor("#FF6384")
+    COR_ROXO = colors.HexColor("#9966FF")
+    COR_LISTRA = colors.HexColor("#f8f9fa")
+    COR_BORDA = colors.HexColor("#dee2e6")
+    COR_FUNDO_KPI = colors.HexColor("#f0f2f5")
+
+    ROTULOS_FORMA = {
+        "cartao_credito": "Cartao Credito",
+        "cartao_debito": "Cartao Debito",
+        "pix": "PIX",
+        "dinheiro": "Dinheiro",
+        "convenio": "Convenio",
+    }
+
+    BASE_TABLE = [
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ROWPADDING", (0, 0), (-1, -1), 5),
+        ("GRID", (0, 0), (-1, -1), 0.4, COR_BORDA),
+    ]
+
+    def _header_style(cor):
+        return [
+            ("BACKGROUND", (0, 0), (-1, 0), cor),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, COR_LISTRA]),
+        ]
+
+    def _section_bar(titulo, cor):
+        """Retorna uma Table de uma célula que parece um cabeçalho colorido."""
+        t = Table([[Paragraph(titulo, sSec)]], colWidths=[W])
+        t.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, -1), cor),
+            ("LEFTPADDING", (0, 0), (-1, -1), 8),
+            ("TOPPADDING", (0, 0), (-1, -1), 6),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ]))
+        return t
+
+    def _kpi_table(labels, values, value_styles=None, n_cols=None):
+        if n_cols is None:
+            n_cols = len(labels)
+        if value_styles is None:
+            value_styles = [sKV] * n_cols
+        row_l = [Paragraph(l, sKL) for l in labels]
+        row_v = [Paragraph(v, value_styles[i]) for i, v in enumerate(values)]
+        t = Table([row_l, row_v], colWidths=[W / n_cols] * n_cols)
+        t.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), COR_FUNDO_KPI),
+            ("BACKGROUND", (0, 1), (-1, 1), colors.white),
+            ("BOX", (0, 0), (-1, -1), 0.5, colors.HexColor("#cccccc")),
+            ("INNERGRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#cccccc")),
+            ("ROWPADDING", (0, 0), (-1, -1), 7),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]))
+        return t
+
+    els = []
+
+    # ── Cabeçalho ──────────────────────────────────────────────
+    els.append(Paragraph("Relatorio Hospitalar Diario", sT))
+    els.append(Paragraph(f"Gerado em {hoje_br}", sSub))
+    els.append(HRFlowable(width="100%", thickness=2, color=COR_AZUL))
+    els.append(Spacer(1, 5 * mm))
+
+    # ══════════════════════════════════════════════════════
+    # SECAO 1 — AGENDA DE HOJE
+    # ══════════════════════════════════════════════════════
+    els.append(_section_bar(f"AGENDA DE HOJE  —  {hoje_br}", COR_AZUL))
+    els.append(Spacer(1, 2 * mm))
+    els.append(Paragraph(f"Medico: {medico_nome}", sMed))
+
+    df_ag = dados["agenda"]
+
+    if df_ag.empty:
+        els.append(Paragraph(f"Nenhuma consulta para {medico_nome} hoje.", sNorm))
+    else:
+        real_ag = int((df_ag["status"] == "realizada").sum())
+        agend_ag = int((df_ag["status"] == "agendada").sum())
+        els.append(_kpi_table(
+            ["Total de Consultas", "Realizadas", "Agendadas"],
+            [str(len(df_ag)), str(real_ag), str(agend_ag)],
+        ))
+        els.append(Spacer(1, 3 * mm))
+
+        rows_ag = linhas_tabela(
+            ["Horario", "Paciente", "Telefone", "Status"],
+            [
+                coluna_texto(df_ag["hora_consulta"]),
+                coluna_texto(df_ag["paciente"], largura=28),
+                coluna_texto(df_ag["telefone"]),
+                coluna_texto(df_ag["status"], capitalizar=True),
+            ],
+        )
+        t_ag = Table(rows_ag, colWidths=[W * 0.12, W * 0.40, W * 0.28, W * 0.20], repeatRows=1)
+        t_ag.setStyle(TableStyle(BASE_TABLE + _header_style(COR_AZUL)))
+        els.append(t_ag)
+
+    els.append(Spacer(1, 5 * mm))
+
+    # ══════════════════════════════════════════════════════
+    # SECAO 2 — RESUMO DE ONTEM
+    # ══════════════════════════════════════════════════════
+    els.append(_section_bar(f"RESUMO DE ONTEM  —  {ontem_br}", colors.HexColor("#37474f")))
+    els.append(Spacer(1, 2 * mm))
+    els.append(Paragraph(f"Medico: {medico_nome}", sMed))
+
+    df_on = dados["ontem"]
+
+    if df_on.empty:
+        els.append(Paragraph(f"Nenhuma consulta para {medico_nome} ontem.", sNorm))
+    else:
+        fat_on = float(df_on["valor_pago"].sum())
+        tot_on = float(df_on["valor_total"].sum())
+        areceber_on = tot_on - fat_on
+        els.append(_kpi_table(
+            ["Consultas", "Faturado", "A Receber"],
+            [str(len(df_on)), formatar_brl(fat_on), formatar_brl(areceber_on)],
+            value_styles=[sKV, sKVg, sKVo],
+        ))
+        els.append(Spacer(1, 3 * mm))
+
+        rows_on = linhas_tabela(
+            ["Horario", "Paciente", "Diagnostico", "Procedimento", "Valor"],
+            [
+                coluna_texto(df_on["hora_consulta"]),
+                coluna_texto(df_on["paciente"], largura=22),
+                coluna_texto(df_on["diagnostico"], largura=24),
+                coluna_texto(df_on["procedimento"], largura=20),
+                coluna_brl(df_on["valor_pago"], zero="-"),
+            ],
+        )
+        t_on = Table(rows_on, colWidths=[W * 0.10, W * 0.24, W * 0.27, W * 0.24, W * 0.15], repeatRows=1)
+        t_on.setStyle(TableStyle(BASE_TABLE + _header_style(colors.HexColor("#37474f"))))
+        t_on.setStyle(TableStyle(BASE_TABLE + _header_style(colors.HexColor("#37474f")) + [
+            ("ALIGN", (-1, 1), (-1, -1), "RIGHT"),
+        ]))
+        els.append(t_on)
+
+    els.append(Spacer(1, 5 * mm))
+
+    # ══════════════════════════════════════════════════════
+    # SECAO 3 — FINANCEIRO DO MES
+    # ══════════════════════════════════════════════════════
+    els.append(_section_bar(f"FINANCEIRO DO MES  —  {mes_nome.upper()}", COR_VERDE))
+    els.append(Spacer(1, 2 * mm))
+
+    fin = dados["financeiro"]
+
+    # Sem contas no mês (ex.: dia 1º), os KPIs saem zerados
+    k = fin["kpis"]
+    rec = float(k["receita_total"])
+    bruto = float(k["valor_bruto"])
+    tot_c = int(k["total_contas"])
+    pagas = int(k["contas_pagas"])
+    pac = int(k["pacientes_atend"])
+    pend = float(k["valor_pendente"])
+    ticket = rec / pac if pac > 0 else 0.0
+    taxa_adim = (pagas / tot_c * 100) if tot_c > 0 else 0.0
+    media_dia = rec / hoje.day if hoje.day > 0 else 0.0
+    desconto_total = bruto - rec
+
+    # KPIs principais (2 colunas x 2 linhas)
+    kpi2_data = [
+        [Paragraph("Receita Total do Mes", sKL), Paragraph("Valor Pendente", sKL)],
+        [Paragraph(formatar_brl(rec), sKVg), Paragraph(formatar_brl(pend), sKVo)],
+        [Paragraph("Pacientes Atendidos", sKL), Paragraph("Contas Pagas", sKL)],
+        [Paragraph(str(pac), sKV), Paragraph(str(pagas), sKV)],
+    ]
+    t_kpi2 = Table(kpi2_data, colWidths=[W / 2, W / 2])
+    t_kpi2.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), COR_FUNDO_KPI),
+        ("BACKGROUND", (0, 2), (-1, 2), COR_FUNDO_KPI),
+        ("BACKGROUND", (0, 1), (-1, 1), colors.white),
+        ("BACKGROUND", (0, 3), (-1, 3), colors.white),
+        ("BOX", (0, 0), (-1, -1), 0.5, colors.HexColor("#cccccc")),
+        ("INNERGRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#cccccc")),
+        ("ROWPADDING", (0, 0), (-1, -1), 7),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    els.append(t_kpi2)
+    els.append(Spacer(1, 3 * mm))
+
+    # KPIs secundários (3 colunas)
+    els.append(_kpi_table(
+        ["Ticket Medio", "Taxa Adimplencia", "Media Diaria de Receita"],
+        [formatar_brl(ticket),
+         f"{taxa_adim:.1f}%",
+         formatar_brl(media_dia)],
+        value_styles=[sKV,
+                      sKVg if taxa_adim >= 60 else sKVo,
+                      sKV],
+    ))
+    els.append(Spacer(1, 3 * mm))
+
+    # KPIs terciários
+    els.append(_kpi_table(
+        ["Total de Contas", "Contas Pendentes", "Desconto por Convenio"],
+        [str(tot_c),
+         str(int(k["contas_pend"])),
+         formatar_brl(desconto_total)],
+        value_styles=[sKV,
+                      sKVo if int(k["contas_pend"]) > 0 else sKV,
+                      sKV],
+    ))
+    els.append(Spacer(1, 4 * mm))
+
+    # -- Top Especialidades --
+    els.append(Paragraph("Top Especialidades por Faturamento", sH3))
+    df_esp = fin["especialidades"].head(8)
+
+    if not df_esp.empty:
+        rows_esp = linhas_tabela(
+            ["Especialidade", "Consultas", "Faturamento", "% Total"],
+            [
+                coluna_texto(df_esp["especialidade"]),
+                coluna_inteiro(df_esp["consultas"]),
+                coluna_brl(df_esp["total"]),
+                coluna_percentual(df_esp["total"], total=df_esp["total"].sum()),
+            ],
+        )
+        t_esp = Table(rows_esp, colWidths=[W * 0.44, W * 0.16, W * 0.25, W * 0.15], repeatRows=1)
+        t_esp.setStyle(TableStyle(BASE_TABLE + _header_style(COR_AZUL2) + [
+            ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+            ("ALIGN", (2, 1), (2, -1), "RIGHT"),
+        ]))
+        els.append(t_esp)
+        els.append(Spacer(1, 4 * mm))
+
+    # -- Top 5 Médicos --
+    els.append(Paragraph("Top 5 Medicos por Faturamento", sH3))
+    df_med = fin["medicos"].head(5)
+
+    if not df_med.empty:
+        rows_med = linhas_tabela(
+            ["Medico", "Especialidade", "Qtd", "Faturamento"],
+            [
+                coluna_texto(df_med["nome"], largura=28),
+                coluna_texto(df_med["especialidade"]),
+                coluna_inteiro(df_med["consultas"]),
+                coluna_brl(df_med["total"]),
+            ],
+        )
+        t_med = Table(rows_med, colWidths=[W * 0.34, W * 0.31, W * 0.11, W * 0.24], repeatRows=1)
+        t_med.setStyle(TableStyle(BASE_TABLE + _header_style(COR_VERDE2) + [
+            ("ALIGN", (2, 0), (-1, -1), "CENTER"),
+            ("ALIGN", (3, 1), (3, -1), "RIGHT"),
+        ]))
+        els.append(t_med)
+        els.append(Spacer(1, 4 * mm))
+
+    # -- Formas de Pagamento --
+    els.append(Paragraph("Receita por Forma de Pagamento", sH3))
+    df_fp = fin["formas_pagamento"].copy()
+    df_fp["forma"] = df_fp["forma_pagamento"].map(ROTULOS_FORMA).fillna(df_fp["forma_pagamento"])
+
+    if not df_fp.empty:
+        rows_fp = linhas_tabela(
+            ["Forma de Pagamento", "Qtd", "Total", "% do Total"],
+            [
+                coluna_texto(df_fp["forma"]),
+                coluna_inteiro(df_fp["qtd"]),
+                coluna_brl(df_fp["total"]),
+                coluna_percentual(df_fp["total"], total=df_fp["total"].sum()),
+            ],
+        )
+        t_fp = Table(rows_fp, colWidths=[W * 0.37, W * 0.13, W * 0.30, W * 0.20], repeatRows=1)
+        t_fp.setStyle(TableStyle(BASE_TABLE + _header_style(COR_ROSA) + [
+            ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+            ("ALIGN", (2, 1), (2, -1), "RIGHT"),
+        ]))
+        els.append(t_fp)
+        els.append(Spacer(1, 4 * mm))
+
+    # -- Convênios --
+    els.append(Paragraph("Atendimentos por Convenio", sH3))
+    df_conv = fin["convenios"]
+
+    if not df_conv.empty:
+        rows_conv = linhas_tabela(
+            ["Convenio", "Atendimentos", "Total Recebido"],
+            [coluna_texto(df_conv["convenio"]), coluna_inteiro(df_conv["qtd"]), coluna_brl(df_conv["total"])],
+        )
+        t_conv = Table(rows_conv, colWidths=[W * 0.44, W * 0.28, W * 0.28], repeatRows=1)
+        t_conv.setStyle(TableStyle(BASE_TABLE + _header_style(COR_ROXO) + [
+            ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+            ("ALIGN", (2, 1), (2, -1), "RIGHT"),
+        ]))
+        els.append(t_conv)
+
+    # -- Diagnósticos mais frequentes no mês --
+    els.append(Spacer(1, 4 * mm))
+    els.append(Paragraph("Diagnosticos Mais Frequentes no Mes", sH3))
+    df_diag = dados["diagnosticos"]
+
+    if not df_diag.empty:
+        rows_diag = linhas_tabela(
+            ["Diagnostico", "Ocorrencias"],
+            [coluna_texto(df_diag["diagnostico"]), coluna_inteiro(df_diag["qtd"])],
+        )
+        t_diag = Table(rows_diag, colWidths=[W * 0.75, W * 0.25], repeatRows=1)
+        t_diag.setStyle(TableStyle(BASE_TABLE + _header_style(colors.HexColor("#546e7a")) + [
+            ("ALIGN", (1, 0), (1, -1), "CENTER"),
+        ]))
+        els.append(t_diag)
+
+    # ── Rodapé ─────────────────────────────────────────────
+    els.append(Spacer(1, 8 * mm))
+    els.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#cccccc")))
+    els.append(Spacer(1, 2 * mm))
+    els.append(Paragraph(
+        f"Relatorio gerado automaticamente em {hoje_br} — Sistema Hospitalar",
+        sFoot,
+    ))
+
+    doc.build(els)
+    buffer.seek(0)
+    return buffer.getvalue()
@@ -0,0 +1,148 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Serialização compacta do resultado da consulta para o prompt de resposta do modelo
+RESULTADO_MAX_TOKENS = int(os.getenv("RESULTADO_MAX_TOKENS", "1500"))
+CHARS_POR_TOKEN = 4  # estimativa para português/números, sem depender de um tokenizador
+LARGURA_MAX_CELULA = 60
+SEPARADOR = " | "
+
+# Colunas de identificador: soma e média não significam nada
+_COLUNA_ID = re.compile(r"(^|_)id(_\d+)?$", re.IGNORECASE)
+
+
+def estimar_tokens(texto):
+    return len(texto) // CHARS_POR_TOKEN + 1
+
+
+def _podar_colunas(df):
+    """Remove colunas sem informação: vazias, repetidas e constantes.
+
+    Retorna (df podado, notas), onde as notas descrevem o que saiu — uma coluna
+    constante vira uma única linha "coluna = valor" em vez de se repetir em cada linha.
+    """
+    notas = []
+    manter = []
+    vistas = []
+    for col in df.columns:
+        serie = df[col]
+        if serie.isna().all():
+            notas.append(f"{col}: vazio em todas as linhas")
+            continue
+        if len(df) > 1 and serie.nunique(dropna=False) == 1:
+            notas.append(f"{col} = {_formatar_serie(serie.iloc[:1]).iloc[0]} (todas as linhas)")
+            continue
+        if any(serie.equals(df[outra]) for outra in vistas):
+            continue
+        vistas.append(col)
+        manter.append(col)
+    return df[manter], notas
+
+
+def _formatar_serie(serie):
+    """Texto compacto de uma coluna inteira, conforme o tipo."""
+    nulos = serie.isna()
+    if pd.api.types.is_bool_dtype(serie):
+        texto = serie.map({True: "sim", False: "não"})
+    elif pd.api.types.is_integer_dtype(serie):
+        texto = serie.astype("string")
+    elif pd.api.types.is_float_dtype(serie):
+        valores = serie.to_numpy(dtype=float, na_value=np.nan)
+        # Inteiros guardados como float (ex.: SUM de inteiros) saem sem casas decimais
+        if np.all(np.isnan(valores) | (valores == np.round(valores))):
+            texto = pd.Series(np.char.mod("%.0f", np.nan_to_num(valores)), index=serie.index)
+        else:
+            texto = pd.Series(np.char.mod("%.2f", np.nan_to_num(valores)), index=serie.index)
+    elif pd.api.types.is_datetime64_any_dtype(serie):
+        sem_hora = (serie.dropna().dt.normalize() == serie.dropna()).all()
+        texto = serie.dt.strftime("%Y-%m-%d" if sem_hora else "%Y-%m-%d %H:%M")
+    else:
+        texto = serie.astype("string").str.replace("\n", " ", regex=False)
+        longos = texto.str.len().fillna(0) > LARGURA_MAX_CELULA
+        if longos.any():
+            texto = texto.where(~longos, texto.str.slice(0, LARGURA_MAX_CELULA - 1) + "…")
+    return texto.astype(object).where(~nulos, "")
+
+
+def _linhas(df):
+    """Uma string por linha, com as células separadas por SEPARADOR."""
+    if df.empty:
+        return []
+    colunas = [_formatar_serie(df[col]) for col in df.columns]
+    linhas = colunas[0].astype(str)
+    for col in colunas[1:]:
+        linhas = linhas + SEPARADOR + col.astype(str)
+    return linhas.tolist()
+
+
+def _resumo(df):
+    """Estatísticas calculadas sobre todas as linhas, para quando nem todas cabem no prompt."""
+    partes = [f"Total de linhas: {len(df)}"]
+    for col in df.columns:
+        serie = df[col].dropna()
+        if serie.empty:
+            continue
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            minimo, maximo = _formatar_serie(pd.Series([serie.min(), serie.max()]))
+            if _COLUNA_ID.search(str(col)):
+                partes.append(f"{col}: de {minimo} a {maximo}")
+                continue
+            soma, = _formatar_serie(pd.Series([serie.sum()]))
+            media, = _formatar_serie(pd.Series([float(serie.mean())]))
+            partes.append(f"{col}: soma {soma}, mín {minimo}, máx {maximo}, média {media}")
+        else:
+            contagem = serie.value_counts()
+            mais_comuns = ", ".join(
+                f"{v} ({n})" for v, n in zip(_formatar_serie(pd.Series(contagem.index[:3])), contagem.iloc[:3])
+            )
+            partes.append(f"{col}: {len(contagem)} valores distintos; mais frequentes: {mais_comuns}")
+    return "\n".join(partes)
+
+
+def serializar_resultado(df, max_tokens=RESULTADO_MAX_TOKENS):
+    """Texto do resultado para o prompt, dentro de ``max_tokens`` (estimados).
+
+    Colunas vazias, repetidas ou constantes são podadas; se todas as linhas não
+    couberem, vão as primeiras e as últimas que couberem junto com um resumo
+    (contagens, somas, mínimos e máximos) calculado sobre o resultado inteiro.
+    """
+    if df.empty:
+        return "Nenhum resultado encontrado."
+
+    n_colunas = len(df.columns)
+    df, notas = _podar_colunas(df)
+    cabecalho = SEPARADOR.join(str(c) for c in df.columns)
+    rodape = "\n".join(notas)
+    linhas = _linhas(df)
+
+    # Com colunas podadas (às vezes todas), a contagem não se lê mais das linhas
+    total = f"Total de linhas: {len(df)}" if len(df.columns) < n_colunas else ""
+    completo = "\n".join(filter(None, [cabecalho, *linhas, rodape, total]))
+    limite = max_tokens * CHARS_POR_TOKEN
+    if len(completo) <= limite:
+        return completo
+
+    resumo = _resumo(df)
+    fixo = len(cabecalho) + len(rodape) + len(resumo) + 80  # 80: linha de "... linhas omitidas ..." e quebras
+    tamanhos = np.fromiter((len(l) + 1 for l in linhas), dtype=np.int64, count=len(linhas))
+    inicio = np.cumsum(tamanhos)
+    fim = np.cumsum(tamanhos[::-1])
+
+    # Maior k tal que k linhas do início + k do fim cabem (k <= metade do total)
+    k = 0
+    while k < len(linhas) // 2 and fixo + inicio[k] + fim[k] <= limite:
+        k += 1
+
+    partes = [resumo, "", cabecalho, *linhas[:k]]
+    omitidas = len(linhas) - 2 * k
+    partes.append(f"... {omitidas} linhas omitidas ...")
+    if k:
+        partes.extend(linhas[-k:])
+    if rodape:
+        partes.append(rodape)
+    texto = "\n".join(partes)
+    # Resumo grande demais para o orçamento (muitas colunas): corta no limite
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Formatação por coluna inteira (Series -> Series de str) para as tabelas dos relatórios:
+# cada função opera sobre a Series toda, sem laço Python por linha.
+
+_MILHAR = r"\B(?=(\d{3})+(?!\d))"
+
+
+def formatar_brl(valor):
+    """Formata float como moeda brasileira: R$ 1.234,56"""
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formatar_data_br(data_iso):
+    """Converte YYYY-MM-DD para DD/MM/AAAA."""
+    if not data_iso:
+        return ""
+    try:
+        parts = data_iso.split("-")
+        return f"{parts[2]}/{parts[1]}/{parts[0]}"
+    except (IndexError, AttributeError):
+        return str(data_iso)
+
+
+def coluna_brl(serie, zero=None):
+    """Moeda brasileira: R$ 1.234,56. Com ``zero``, valores <= 0 (e nulos) viram esse texto."""
+    valores = pd.to_numeric(serie, errors="coerce").astype(float)
+    # "%.2f" arredonda igual ao f-string de formatar_brl; depois só troca os separadores
+    texto = pd.Series(np.char.mod("%.2f", valores.fillna(0).to_numpy()), index=serie.index)
+    inteiros = texto.str.slice(0, -3).str.replace(_MILHAR, ".", regex=True)
+    texto = "R$ " + inteiros + "," + texto.str.slice(-2)
+    if zero is not None:
+        texto = texto.where(valores > 0, zero)
+    return texto.astype(object)
+
+
+def coluna_decimal(serie, casas=2, prefixo="", sufixo=""):
+    """Número com ponto decimal e casas fixas (ex.: "R$ 350.00", "12.5%")."""
+    valores = pd.to_numeric(serie, errors="coerce").astype(float).fillna(0).to_numpy()
+    formato = prefixo.replace("%", "%%") + f"%.{casas}f" + sufixo.replace("%", "%%")
+    return pd.Series(np.char.mod(formato, valores), index=serie.index).astype(object)
+
+
+def coluna_percentual(serie, total=None, casas=1):
+    """Percentual "12.5%"; com ``total``, calcula a participação de cada valor nele."""
+    valores = pd.to_numeric(serie, errors="coerce").astype(float)
+    if total is not None:
+        valores = valores / total * 100 if total > 0 else valores * 0
+    return coluna_decimal(valores, casas, sufixo="%")
+
+
+def coluna_inteiro(serie):
+    return pd.to_numeric(serie, errors="coerce").fillna(0).astype(np.int64).astype(str).astype(object)
+
+
+def coluna_data_br(serie):
+    """YYYY-MM-DD -> DD/MM/AAAA; outros textos ficam como estão e nulos viram ""."""
+    texto = serie.astype("string")
+    iso = texto.str.fullmatch(r"\d{4}-\d{2}-\d{2}").fillna(False)
+    br = texto.str.slice(8, 10) + "/" + texto.str.slice(5, 7) + "/" + texto.str.slice(0, 4)
+    return br.where(iso, texto).fillna("").astype(object)
+
+
+def coluna_texto(serie, largura=None, vazio="-", capitalizar=False):
+    """Texto com nulos/vazios trocados por ``vazio`` e, opcionalmente, cortado em ``largura``."""
+    texto = serie.astype("string")
+    texto = texto.mask(texto.isna() | (texto == ""), vazio)
+    if capitalizar:
+        texto = texto.str.capitalize()
+    if largura is not None:
+        texto = texto.str.slice(0, largura)
+    return texto.astype(object)
+
+
+def tabela_markdown(cabecalho, colunas):
+    """Tabela markdown (sem quebra de linha final) a partir de Series já formatadas."""
+    linha = "| " + " | ".join(cabecalho) + " |\n|" + "|".join("-" * (len(c) + 2) for c in cabecalho) + "|"
+    if not colunas or colunas[0].empty:
+        return linha
+    corpo = "| " + colunas[0].astype(str)
+    for coluna in colunas[1:]:
+        corpo = corpo + " | " + coluna.astype(str)
+    corpo = corpo + " |"
+    return linha + "\n" + "\n".join(corpo.tolist())
+
+
+def linhas_tabela(cabecalho, colunas):
+    """Lista de linhas para reportlab.platypus.Table: cabeçalho + uma lista por linha."""
+    return [list(cabecalho)] + [list(linha) for linha in zip(*(c.tolist() for c in colunas))]
@@ -0,0 +1,65 @@
+from intencoes import AGENDA_HOJE, DASHBOARD_FINANCEIRO, RESUMO_ONTEM, classificar_intencao
+
+MEDICOS = [
+    "Dr. Roberto Mendes", "Dra. Patrícia Nunes", "Dr. André Barbosa", "Dra. Camila Farias",
+    "Dr. Paulo Henrique", "Dra. Larissa Martins",
+]
+
+
+def test_agenda_de_hoje():
+    assert classificar_intencao("agenda do Dr. Roberto", MEDICOS) == (AGENDA_HOJE, "Dr. Roberto Mendes")
+    assert classificar_intencao("Quais as consultas de hoje da Dra. Camila Farias?", MEDICOS) == (
+        AGENDA_HOJE, "Dra. Camila Farias")
+
+
+def test_nome_com_erro_de_digitacao():
+    assert classificar_intencao("agenda da dra patricia nunis", MEDICOS) == (AGENDA_HOJE, "Dra. Patrícia Nunes")
+
+
+def test_resumo_de_ontem():
+    assert classificar_intencao("como foi o dia de ontem do doutor André Barbosa?", MEDICOS) == (
+        RESUMO_ONTEM, "Dr. André Barbosa")
+
+
+def test_dashboard_do_mes():
+    assert classificar_intencao("mostre o dashboard financeiro", MEDICOS) == (DASHBOARD_FINANCEIRO, None)
+    assert classificar_intencao("resumo financeiro do mês", MEDICOS) == (DASHBOARD_FINANCEIRO, None)
+
+
+def test_outros_periodos_seguem_para_sql():
+    assert classificar_intencao("agenda de amanhã do Dr. Roberto", MEDICOS) is None
+    assert classificar_intencao("qual a agenda da semana da Dra. Camila", MEDICOS) is None
+    assert classificar_intencao("agenda do Dr. Roberto em 10/03", MEDICOS) is None
+    assert classificar_intencao("consultas do mês da Dra. Larissa", MEDICOS) is None
+    assert classificar_intencao("resumo financeiro de janeiro", MEDICOS) is None
+    assert classificar_intencao("dashboard financeiro do ano passado", MEDICOS) is None
+
+
+def test_paciente_nao_e_medico():
+    assert classificar_intencao("agenda da paciente Camila Rodrigues", MEDICOS) is None
+    assert classificar_intencao("consultas de ontem da paciente Larissa Duarte", MEDICOS) is None
+    assert classificar_intencao("agenda da Camila Rodrigues", MEDICOS) is None
+
+
+def test_nome_exige_titulo_e_tokens_inteiros():
+    assert classificar_intencao("agenda do Roberto Mendes", MEDICOS) is None
+    assert classificar_intencao("agenda do Dr. Rob", MEDICOS) is None
+    # Nome ambíguo entre dois médicos
+    assert classificar_intencao("agenda do Dr. Paulo", MEDICOS + ["Dr. Paulo Souza"]) is None
+
+
+def test_dashboard_so_para_o_financeiro_do_mes():
+    assert classificar_intencao("resumo financeiro de hoje", MEDICOS) is None
+    assert classificar_intencao("relatório financeiro de ontem", MEDICOS) is None
+    assert classificar_intencao("dashboard de pacientes", MEDICOS) is None
+    assert classificar_intencao("receita mensal", MEDICOS) is None
+    assert classificar_intencao("faturamento deste mês", MEDICOS) == (DASHBOARD_FINANCEIRO, None)
+
+
+def test_filtros_que_o_relatorio_nao_aplica():
+    assert classificar_intencao("pacientes de hoje do Dr. Roberto que são da Unimed", MEDICOS) is None
+    assert classificar_intencao("faturamento do Dr Roberto ontem por convênio", MEDICOS) is None
+    assert classificar_intencao("consultas canceladas de hoje da Dra. Camila", MEDICOS) is None
+    assert classificar_intencao("agenda do Dr. Roberto à tarde", MEDICOS) is None
+    assert classificar_intencao("dashboard financeiro por especialidade", MEDICOS) is None
+    assert classificar_intencao("por favor, agenda do Dr. Roberto", MEDICOS) == (AGENDA_HOJE, "Dr. Roberto Mendes")
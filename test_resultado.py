@@ -0,0 +1,27 @@
+import pandas as pd
+
+from resultado import serializar_resultado
+
+
+def test_sem_poda_nao_repete_a_contagem():
+    df = pd.DataFrame({"medico": ["Dr. A", "Dra. B"], "consultas": [3, 5]})
+    assert serializar_resultado(df) == "medico | consultas\nDr. A | 3\nDra. B | 5"
+
+
+def test_colunas_constantes_mantem_a_contagem():
+    df = pd.DataFrame({"status": ["agendada"] * 30, "hora": [f"{h:02d}:00" for h in range(30)]})
+    texto = serializar_resultado(df)
+    assert "status = agendada (todas as linhas)" in texto
+    assert "Total de linhas: 30" in texto
+
+
+def test_todas_as_colunas_constantes():
+    df = pd.DataFrame({"status": ["agendada"] * 30})
+    assert serializar_resultado(df) == "status = agendada (todas as linhas)\nTotal de linhas: 30"
+
+
+def test_resultado_truncado_traz_o_resumo():
+    df = pd.DataFrame({"id": range(1000), "valor": [10.5] * 999 + [20.0]})
+    texto = serializar_resultado(df, max_tokens=200)
+    assert texto.startswith("Total de linhas: 1000")
+    assert "linhas omitidas" in texto
@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+
+import database
+
+_CONTAS = """
+    SELECT dia, medico_id, procedimento_id, convenio_id, status, n_contas, n_consultas,
+           ROUND(valor_total, 2), ROUND(valor_pago, 2)
+    FROM rollup_contas_diario
+    WHERE n_contas != 0 OR n_consultas != 0 OR ROUND(valor_total, 2) != 0 OR ROUND(valor_pago, 2) != 0
+    ORDER BY 1, 2, 3, 4, 5
+"""
+_PAGAMENTOS = """
+    SELECT dia, forma_pagamento, n_pagamentos, ROUND(valor, 2)
+    FROM rollup_pagamentos_diario
+    WHERE n_pagamentos != 0 OR ROUND(valor, 2) != 0
+    ORDER BY 1, 2
+"""
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    database.close_pool()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "hospital.db"))
+    database.init_db()
+    conn = sqlite3.connect(database.DB_PATH, isolation_level=None)
+    yield conn
+    conn.close()
+    database.close_pool()
+
+
+def _rollups(conn):
+    return conn.execute(_CONTAS).fetchall(), conn.execute(_PAGAMENTOS).fetchall()
+
+
+def _confere(conn):
+    """Os rollups mantidos pelos triggers são iguais aos recalculados do zero."""
+    incrementais = _rollups(conn)
+    conn.execute("BEGIN")
+    database.rebuild_rollups(conn.cursor())
+    recalculados = _rollups(conn)
+    conn.execute("ROLLBACK")
+    assert incrementais == recalculados
+
+
+def _nova_conta(conn, consulta_id, id=None, valor=100.0, status="pendente"):
+    cursor = conn.execute(
+        "INSERT INTO contas (id, consulta_id, procedimento_id, convenio_id, valor_total, valor_pago, status, data_emissao) "
+        "SELECT ?, ?, 1, 1, ?, 0, ?, data_consulta FROM consultas WHERE id = ?",
+        (id, consulta_id, valor, status, consulta_id),
+    )
+    return cursor.lastrowid
+
+
+def test_insercao_e_remocao(conn):
+    _confere(conn)
+    consulta = conn.execute("SELECT consulta_id FROM contas ORDER BY id LIMIT 1").fetchone()[0]
+    segunda = _nova_conta(conn, consulta, valor=50.0)
+    _confere(conn)
+
+    # A primeira conta da consulta sai: a segunda passa a contar a consulta
+    conn.execute("DELETE FROM contas WHERE id = (SELECT MIN(id) FROM contas WHERE consulta_id = ?)", (consulta,))
+    _confere(conn)
+    conn.execute("DELETE FROM contas WHERE id = ?", (segunda,))
+    _confere(conn)
+
+
+def test_conta_com_id_menor_que_a_primeira(conn):
+    livre, outra = conn.execute("SELECT id, consulta_id FROM contas ORDER BY id LIMIT 1").fetchone()
+    consulta = conn.execute("SELECT consulta_id FROM contas WHERE consulta_id != ? ORDER BY id DESC LIMIT 1",
+                            (outra,)).fetchone()[0]
+    conn.execute("DELETE FROM contas WHERE id = ?", (livre,))
+    _nova_conta(conn, consulta, id=livre)
+    _confere(conn)
+
+
+def test_atualizacoes(conn):
+    conta, consulta = conn.execute("SELECT id, consulta_id FROM contas ORDER BY id LIMIT 1").fetchone()
+    conn.execute("UPDATE contas SET status = 'pago', valor_pago = valor_total WHERE id = ?", (conta,))
+    conn.execute("UPDATE contas SET convenio_id = NULL, data_emissao = '2020-01-01' WHERE id = ?", (conta,))
+    _confere(conn)
+    conn.execute("UPDATE consultas SET medico_id = (SELECT MAX(id) FROM medicos) WHERE id = ?", (consulta,))
+    _confere(conn)
+
+
+def test_troca_de_consulta(conn):
+    origem, destino = [r[0] for r in conn.execute("SELECT consulta_id FROM contas ORDER BY id LIMIT 2")]
+    extra = _nova_conta(conn, origem, valor=80.0)
+    _confere(conn)
+
+    # A primeira conta de origem vai para destino, onde não é a primeira...
+    primeira = conn.execute("SELECT MIN(id) FROM contas WHERE consulta_id = ?", (origem,)).fetchone()[0]
+    conn.execute("UPDATE contas SET consulta_id = ? WHERE id = ?", (destino, primeira))
+    _confere(conn)
+    # ...e uma conta mais nova passa a ser a primeira de uma consulta sem contas
+    vazia = conn.execute("SELECT id FROM consultas WHERE id NOT IN (SELECT consulta_id FROM contas) LIMIT 1").fetchone()[0]
+    conn.execute("UPDATE contas SET consulta_id = ? WHERE id = ?", (vazia, extra))
+    _confere(conn)
+    # Volta para a consulta de origem com id menor que a conta que estava lá
+    conn.execute("UPDATE contas SET consulta_id = ? WHERE id = ?", (origem, primeira))
+    _confere(conn)
+
+
+def test_pagamentos(conn):
+    conta = conn.execute("SELECT MIN(id) FROM contas").fetchone()[0]
+    novo = conn.execute(
+        "INSERT INTO pagamentos (conta_id, valor, forma_pagamento, data_pagamento) VALUES (?, 10, 'pix', '2024-05-01')",
+        (conta,),
+    ).lastrowid
+    conn.execute("UPDATE pagamentos SET valor = 25, forma_pagamento = 'dinheiro' WHERE id = ?", (novo,))
+    _confere(conn)
+    conn.execute("DELETE FROM pagamentos WHERE id = (SELECT MIN(id) FROM pagamentos)")
+    _confere(conn)